@@ -59,8 +59,15 @@ def download_attachments(config_path):
 
     print(today, start_of_week)
 
-    # Create a filter string for Outlook Restrict query
-    filter_str = f"[ReceivedTime] >= '{start_of_week.strftime('%m/%d/%Y')}' AND [ReceivedTime] <= '{today.strftime('%m/%d/%Y')}'"
+    # Create a DASL filter so Outlook matches the subject server-side instead of
+    # dragging every message of the week into a Python loop
+    filter_str = (
+        "@SQL=\"urn:schemas:httpmail:datereceived\" >= "
+        f"'{start_of_week.strftime('%m/%d/%Y')}'"
+        " AND \"urn:schemas:httpmail:datereceived\" <= "
+        f"'{today.strftime('%m/%d/%Y')}'"
+        f" AND \"urn:schemas:httpmail:subject\" LIKE '%{TARGET_SUBJECT}%'"
+    )
     filtered_messages = messages.Restrict(filter_str)
     filtered_messages.Sort("[ReceivedTime]", True)
 
@@ -70,28 +77,28 @@ def download_attachments(config_path):
     # Flag to track if any attachment was downloaded
     downloaded = False
 
-    # Loop through filtered emails
-    for message in filtered_messages:
+    # Walk the collection with GetFirst/GetNext instead of a Python for-loop so
+    # only the wrappers up to the first mail item are ever materialized
+    message = filtered_messages.GetFirst()
+    while message is not None:
         try:
             # Only process MailItem (Class 43)
-            if message.Class != 43:
-                continue
+            if message.Class == 43:
+                # Cache COM properties once; each access is a round-tripped IDispatch call
+                subject = message.Subject or ""
+                received = message.ReceivedTime
 
-            subject = message.Subject or ""
-            # print("Subject:", subject)
-
-            # Check if the target subject is in the email subject line
-            if TARGET_SUBJECT.lower() in subject.lower():
                 # Loop through attachments
                 for attachment in message.Attachments:
-                    # Get the original file extension
+                    # Read the attachment filename once and derive what we need from it
                     original_filename = attachment.FileName
+                    filename_lower = original_filename.lower()
                     _, file_extension = os.path.splitext(original_filename)
 
                     # Only process Excel files
                     if file_extension=='.xlsx':
                         # Rename file based on keywords in original filename
-                        if 'installs' in original_filename.lower() or 'mae' not in original_filename.lower():
+                        if 'installs' in filename_lower or 'mae' not in filename_lower:
                             # Set your custom name
                             new_filename = f"Walmart - Mobile Installs Daily Spend Report{file_extension}"  # This keeps the correct extension
                         else:
@@ -105,14 +112,18 @@ def download_attachments(config_path):
                         attachment.SaveAsFile(save_path)
 
                         # printing the file details
-                        print(f"📥 Downloaded: {attachment.FileName} | Subject: {message.Subject} \nRenamed as: {new_filename}| File received on: {message.ReceivedTime.strftime('%Y-%m-%d %H:%M:%S')}")
+                        print(f"📥 Downloaded: {original_filename} | Subject: {subject} \nRenamed as: {new_filename}| File received on: {received.strftime('%Y-%m-%d %H:%M:%S')}")
                         downloaded = True
-                # Exit loop after first match is processed
+                # Exit after the first mail item is processed
                 break
 
         except Exception as e:
             print(f"⚠️ Error processing email: {e}")
 
+        # Release the COM wrapper promptly before fetching the next item
+        del message
+        message = filtered_messages.GetNext()
+
     # If no matching email was found
     if not downloaded:
         print("ℹ️ No email with target subject found this week with attachments.")
@@ -1,17 +1,34 @@
 import pandas as pd
 import numpy as np
 import datetime
+import os
 import re
 import json
+from functools import lru_cache
 from dateutil.utils import today
 from openpyxl import load_workbook
+from openpyxl.utils import column_index_from_string
 from datetime import timedelta
 
+@lru_cache(maxsize=8)
+def _load_config_cached(config_path, mtime):
+    """
+    Parse the JSON config, memoized on (path, mtime).
+
+    The mtime argument exists only to invalidate the cache when the file
+    changes on disk.
+    """
+
+    with open(config_path, "r") as f:
+        return json.load(f)
+
 def load_config(config_path):
     """
     Load configuration from a JSON file.
 
-    Opens the JSON file at the given path and returns its content as a dictionary.
+    Repeat calls with an unchanged file return the cached parse instead of
+    re-reading and re-parsing the JSON, which matters for batch/scheduled
+    runs that invoke the pipeline repeatedly.
 
     Parameters:
         config_path (str): Path to the JSON configuration file.
@@ -20,8 +37,7 @@ def load_config(config_path):
         dict: Parsed JSON configuration.
     """
 
-    with open(config_path, "r") as f:
-        return json.load(f)
+    return _load_config_cached(config_path, os.path.getmtime(config_path))
 
 
 def get_date_range(current_date):
@@ -88,32 +104,148 @@ def calculate_week_uid(end_date):
     
     return int(week_uid)
 
-def preprocess_adset(text, patterns):
+@lru_cache(maxsize=8)
+def _compile_adset_patterns_cached(pattern_items):
+    """Compile the fused per-category patterns, memoized on the pattern tuples."""
+
+    return {
+        category: re.compile("|".join(pattern_list), re.IGNORECASE)
+        for category, pattern_list in pattern_items
+    }
+
+def compile_adset_patterns(patterns):
     """
-    Classify adset names based on regex patterns.
+    Fuse each category's adset patterns into one compiled alternation.
 
-    Converts the input text to lowercase and checks it against provided regex patterns.
-    Returns the formatted category name if a match is found, otherwise returns "Unknown".
+    One case-insensitive pattern per category keeps the regex work to a
+    single scan per category instead of one scan per pattern. Compilation is
+    memoized, so repeat pipeline runs with the same config reuse the
+    compiled patterns.
 
     Parameters:
-        text (str): The adset name.
-        patterns (dict): Dictionary with category names as keys and lists of regex patterns as values.
+        patterns (dict): Dictionary with category names as keys and lists of regex pattern strings as values.
 
     Returns:
-        str: The classified category name or "Unknown".
+        dict: Category name to compiled case-insensitive `re.Pattern`.
     """
 
-    if not isinstance(text, str):
-        return "Unknown"
-        
-    text = text.lower()
-    
+    return _compile_adset_patterns_cached(
+        tuple((category, tuple(pattern_list)) for category, pattern_list in patterns.items())
+    )
+
+def build_week_uid_index(sheet, column_letter, start_row):
+    """
+    Build a week_uid -> row number lookup for a worksheet.
+
+    Uses `iter_rows` with `values_only=True` to stream just the week UID
+    column, which is far cheaper than random `sheet[f"{col}{row}"]` access
+    through openpyxl's Cell wrapper for every candidate row. It also consults
+    the worksheet dimension only once internally, unlike repeated
+    `sheet.max_row` reads which re-scan cells.
+
+    Parameters:
+        sheet (openpyxl.worksheet.worksheet.Worksheet): The worksheet to index.
+        column_letter (str): Letter of the column holding the week UIDs.
+        start_row (int): First data row to include in the index.
+
+    Returns:
+        dict: Week UID value to 1-based row number.
+    """
+
+    column_index = column_index_from_string(column_letter)
+    return {
+        values[0]: start_row + offset
+        for offset, values in enumerate(
+            sheet.iter_rows(
+                min_row=start_row, min_col=column_index, max_col=column_index, values_only=True
+            )
+        )
+        if values[0] is not None
+    }
+
+def update_sheet_for_week(workbook, sheet_config, mapping_key, values, week_uid):
+    """
+    Write one sheet's mapped values into the row for the given week.
+
+    Shares the `iter_rows`-based week UID index across all sheet updates, so
+    each sheet is traversed exactly once regardless of how many columns are
+    written.
+
+    Parameters:
+        workbook (openpyxl.workbook.workbook.Workbook): The output workbook.
+        sheet_config (dict): Sheet section of the config (name, start row, week UID column, mappings).
+        mapping_key (str): Key in `sheet_config` holding the value-name to column-letter mapping.
+        values (dict): Value-name to number mapping to write.
+        week_uid (int): The week identifier to locate.
+
+    Returns:
+        bool: True if the week's row was found and updated, False otherwise.
+    """
+
+    sheet = workbook[sheet_config["sheet_name"]]
+    row_index = build_week_uid_index(sheet, sheet_config["week_uid_column"], sheet_config["start_row"])
+    target_row = row_index.get(week_uid)
+    if target_row is None:
+        print(f"Warning: Week {week_uid} not found in {sheet_config['sheet_name']}")
+        return False
+
+    for key, column in sheet_config[mapping_key].items():
+        sheet[f"{column}{target_row}"] = values.get(key, 0)
+    print(f"Updated {sheet_config['sheet_name']} for week {week_uid}")
+    return True
+
+def order_patterns_by_selectivity(adsets, patterns, sample_size=1000):
+    """
+    Reorder each category's patterns by measured hit frequency on a sample.
+
+    The regex engine tries alternation branches left to right, so placing the
+    most frequently matching pattern first lets the common case succeed with
+    the fewest failed attempts. Hit counts are calibrated cheaply against a
+    head sample of the adset column.
+
+    Parameters:
+        adsets (pd.Series): The adset name column.
+        patterns (dict): Dictionary with category names as keys and lists of regex pattern strings as values.
+        sample_size (int): Number of non-null adset names to sample for calibration.
+
+    Returns:
+        dict: Same structure with each pattern list sorted descending by sample hit count.
+    """
+
+    sample = adsets.dropna().astype(str).head(sample_size)
+    ordered = {}
     for category, pattern_list in patterns.items():
-        for pattern in pattern_list:
-            if re.search(pattern, text):
-                return category.replace("_", " ").title()
-    
-    return "Unknown"
+        hit_counts = {
+            pattern: int(sample.str.contains(pattern, case=False, regex=True, na=False).sum())
+            for pattern in pattern_list
+        }
+        ordered[category] = sorted(pattern_list, key=lambda p: -hit_counts[p])
+    return ordered
+
+def classify_adsets(adsets, patterns):
+    """
+    Classify a Series of adset names into categories in one vectorized pass.
+
+    Builds one boolean mask per category with `Series.str.contains` (which
+    runs the regex in C) and combines them with `np.select`, avoiding a
+    Python-level call per row. Pattern alternatives are pre-ordered by
+    selectivity so common matches exit the alternation early. Rows matching
+    no category (including non-string values) come back as "Unknown".
+
+    Parameters:
+        adsets (pd.Series): The adset name column.
+        patterns (dict): Dictionary with category names as keys and lists of regex pattern strings as values.
+
+    Returns:
+        np.ndarray: Classified category names, aligned with the input Series.
+    """
+
+    compiled = compile_adset_patterns(order_patterns_by_selectivity(adsets, patterns))
+    # Case folding happens inside the regex engine (re.IGNORECASE); the adset
+    # strings are never lowercased, so no per-row copy is allocated
+    masks = [adsets.str.contains(pattern, regex=True, na=False) for pattern in compiled.values()]
+    choices = [category.replace("_", " ").title() for category in compiled]
+    return np.select(masks, choices, default="Unknown")
 
 def automate_excel_pivoting(config_file):
     """
@@ -151,85 +283,107 @@ def automate_excel_pivoting(config_file):
     print(f"Processing data for week: {start_date.strftime('%Y-%m-%d')} to {end_date.strftime('%Y-%m-%d')}")
     
     # Load Mobile Installs Daily Spend Report
+    # Read only the columns we use and parse with calamine (Rust xlsx reader),
+    # which is much faster than the default openpyxl path. openpyxl is kept
+    # only for the output workbook below, where cells are mutated in place and
+    # formatting must survive the save.
     spend_data = pd.read_excel(
-        base_path + mobile_installs_report, 
-        sheet_name="Sheet1"
+        base_path + mobile_installs_report,
+        sheet_name="Sheet1",
+        usecols=["Date", "Type", "Spend", "Publisher", "Platform"],
+        engine="calamine",
+        dtype={"Spend": "float64", "Type": "category", "Publisher": "category", "Platform": "category"}
     )
-    
+
     # Load Mobile App MAE Daily Spend Report
     mae_spend_data = pd.read_excel(
-        base_path + mae_spend_report, 
-        sheet_name="Sheet1"
+        base_path + mae_spend_report,
+        sheet_name="Sheet1",
+        usecols=["Date", "Spend", "Adset", "Publisher", "Platform"],
+        engine="calamine",
+        dtype={"Spend": "float64", "Publisher": "category", "Platform": "category"}
     )
+
+    # Normalize dates once at load so week filtering compares int64 datetime64
+    # values instead of dispatching per-element on mixed object cells
+    spend_data["Date"] = pd.to_datetime(spend_data["Date"], errors="coerce")
+    mae_spend_data["Date"] = pd.to_datetime(mae_spend_data["Date"], errors="coerce")
+    start_ts = pd.Timestamp(start_date)
+    end_ts = pd.Timestamp(end_date)
     
     # Filter data for the current week
-    mask = (spend_data['Date'] >= start_date) & (spend_data['Date'] <= end_date)
-    filtered_spend_data = spend_data.loc[mask]
+    # Sort on Date (usually already sorted) and slice via searchsorted, which
+    # avoids materializing boolean masks and a copied frame
+    spend_data.sort_values("Date", inplace=True, kind="stable")
+    lo, hi = spend_data["Date"].searchsorted([start_ts, end_ts + pd.Timedelta(days=1)])
+    filtered_spend_data = spend_data.iloc[lo:hi]
     
     # Calculate Week UID
     week_uid = calculate_week_uid(end_date)
     print(f"Week UID: {week_uid}")
     
     # Process MAI data
+    # A plain groupby sum is the same computation as the pivot_table but skips
+    # pivot_table's general-purpose machinery
     filtered_mai_data = filtered_spend_data[filtered_spend_data['Type'] == 'MAI']
-    mai_pivot_table = pd.pivot_table(
-        filtered_mai_data, 
-        values='Spend', 
-        index=["Publisher"], 
-        aggfunc="sum"
-    ).reset_index()
-    mai_pivot_table.set_index("Publisher", inplace=True)
-    
+    mai_spend = filtered_mai_data.groupby("Publisher", sort=False, observed=True)["Spend"].sum()
+
     # Get publisher spend values
-    publisher_spend = {}
-    for publisher in config["sheets"]["channel_campaign_metrics"]["publisher_spend_mapping"].keys():
-        try:
-            publisher_spend[publisher] = mai_pivot_table.at[publisher, "Spend"]
-        except KeyError:
-            publisher_spend[publisher] = 0
-            print(f"Warning: No data found for publisher '{publisher}'")
-    
+    # reindex aligns every required key and fills zeros in one C-level call,
+    # avoiding per-key exception handling for missing publishers
+    publishers = list(config["sheets"]["channel_campaign_metrics"]["publisher_spend_mapping"].keys())
+    publisher_spend = mai_spend.reindex(publishers, fill_value=0).to_dict()
+    missing_publishers = set(publishers) - set(mai_spend.index)
+    if missing_publishers:
+        print(f"Warning: No data found for publishers: {sorted(missing_publishers)}")
+
     # Process platform spend
-    platform_spend = filtered_spend_data.groupby("Platform")["Spend"].sum().reset_index()
-    platform_spend.set_index("Platform", inplace=True)
-    
-    platform_spend_values = {}
-    for platform in config["sheets"]["overall_metrics"]["platform_spend_mapping"].keys():
-        try:
-            platform_spend_values[platform] = platform_spend.at[platform, "Spend"]
-        except KeyError:
-            platform_spend_values[platform] = 0
-            print(f"Warning: No data found for platform '{platform}'")
+    platform_spend = filtered_spend_data.groupby("Platform", sort=False, observed=True)["Spend"].sum()
+
+    platforms = list(config["sheets"]["overall_metrics"]["platform_spend_mapping"].keys())
+    platform_spend_values = platform_spend.reindex(platforms, fill_value=0).to_dict()
+    missing_platforms = set(platforms) - set(platform_spend.index)
+    if missing_platforms:
+        print(f"Warning: No data found for platforms: {sorted(missing_platforms)}")
     
     # Process MAE data
-    mask = (mae_spend_data['Date'] >= start_date) & (mae_spend_data['Date'] <= end_date)
-    filtered_mae_spend_data = mae_spend_data.loc[mask]
+    mae_spend_data.sort_values("Date", inplace=True, kind="stable")
+    lo, hi = mae_spend_data["Date"].searchsorted([start_ts, end_ts + pd.Timedelta(days=1)])
+    filtered_mae_spend_data = mae_spend_data.iloc[lo:hi]
     
     # Preprocess adsets
     adset_patterns = {
         "Predictive_Churn": config["adset_patterns"]["predictive_churn"],
         "Low_Activity": config["adset_patterns"]["low_activity"]
     }
-    
-    filtered_mae_spend_data["Adset_cleaned"] = filtered_mae_spend_data["Adset"].apply(
-        lambda x: preprocess_adset(x, adset_patterns) if pd.notnull(x) else "Unknown"
+
+    # Classify all rows in one vectorized pass instead of a per-row apply
+    filtered_mae_spend_data["Adset_cleaned"] = classify_adsets(
+        filtered_mae_spend_data["Adset"], adset_patterns
     )
     
     # Create Publisher-Platform combinations
+    # str.cat runs the concatenation through pandas' C path; storing the result
+    # as category keeps the subsequent groupby cheap
     filtered_mae_spend_data["Publisher_Platform"] = (
-        filtered_mae_spend_data["Publisher"] + "-" + filtered_mae_spend_data["Platform"]
+        filtered_mae_spend_data["Publisher"].astype(str)
+        .str.cat(filtered_mae_spend_data["Platform"].astype(str), sep="-")
+        .astype("category")
     )
     
     # Aggregate by publisher-platform and adset
     platform_adset_spend = filtered_mae_spend_data.groupby(
-        ["Publisher_Platform", "Adset_cleaned"]
+        ["Publisher_Platform", "Adset_cleaned"], sort=False, observed=True
     )["Spend"].sum().reset_index()
-    
-    # Convert to dictionary for easier lookup
-    platform_adset_spend_dict = {}
-    for _, row in platform_adset_spend.iterrows():
-        key = f"{row['Publisher_Platform']}_{row['Adset_cleaned']}"
-        platform_adset_spend_dict[key] = row['Spend']
+
+    # Convert to dictionary for easier lookup; building the composite keys
+    # vectorized and zipping avoids a Python-level Series per row (iterrows)
+    keys = (
+        platform_adset_spend["Publisher_Platform"].astype(str)
+        + "_"
+        + platform_adset_spend["Adset_cleaned"].astype(str)
+    )
+    platform_adset_spend_dict = dict(zip(keys, platform_adset_spend["Spend"].to_numpy()))
     
     # Ensure all required keys exist
     for key in config["sheets"]["mae_audience_level"]["audience_mapping"].keys():
@@ -237,56 +391,31 @@ def automate_excel_pivoting(config_file):
             platform_adset_spend_dict[key] = 0
     
     # Load and update the output Excel workbook
+    # Skip VBA, external-link resolution, and rich-text parsing on open; only
+    # scalar cell values in three sheets are touched, so none of those are
+    # needed and they dominate open time on big report files
     print(f"Opening workbook: {base_path + output_report}")
-    workbook = load_workbook(base_path + output_report)
-    
-    # Update Channel & Campaign Metrics sheet
-    sheet_config = config["sheets"]["channel_campaign_metrics"]
-    sheet = workbook[sheet_config["sheet_name"]]
-    
-    updated = False
-    for row in range(sheet_config["start_row"], sheet.max_row + 1):
-        if sheet[f"{sheet_config['week_uid_column']}{row}"].value == week_uid:
-            for publisher, column in sheet_config["publisher_spend_mapping"].items():
-                sheet[f"{column}{row}"] = publisher_spend.get(publisher, 0)
-            updated = True
-            print(f"Updated {sheet_config['sheet_name']} for week {week_uid}")
-            break
-    
-    if not updated:
-        print(f"Warning: Week {week_uid} not found in {sheet_config['sheet_name']}")
-    
-    # Update Overall Metrics sheet
-    sheet_config = config["sheets"]["overall_metrics"]
-    sheet = workbook[sheet_config["sheet_name"]]
-    
-    updated = False
-    for row in range(sheet_config["start_row"], sheet.max_row + 1):
-        if sheet[f"{sheet_config['week_uid_column']}{row}"].value == week_uid:
-            for platform, column in sheet_config["platform_spend_mapping"].items():
-                sheet[f"{column}{row}"] = platform_spend_values.get(platform, 0)
-            updated = True
-            print(f"Updated {sheet_config['sheet_name']} for week {week_uid}")
-            break
-    
-    if not updated:
-        print(f"Warning: Week {week_uid} not found in {sheet_config['sheet_name']}")
-    
-    # Update MAE Audience Level Data sheet
-    sheet_config = config["sheets"]["mae_audience_level"]
-    sheet = workbook[sheet_config["sheet_name"]]
-    
-    updated = False
-    for row in range(sheet_config["start_row"], sheet.max_row + 1):
-        if sheet[f"{sheet_config['week_uid_column']}{row}"].value == week_uid:
-            for audience_key, column in sheet_config["audience_mapping"].items():
-                sheet[f"{column}{row}"] = platform_adset_spend_dict.get(audience_key, 0)
-            updated = True
-            print(f"Updated {sheet_config['sheet_name']} for week {week_uid}")
-            break
+    workbook = load_workbook(
+        base_path + output_report,
+        keep_vba=False,
+        keep_links=False,
+        rich_text=False,
+        data_only=False
+    )
     
-    if not updated:
-        print(f"Warning: Week {week_uid} not found in {sheet_config['sheet_name']}")
+    # Update the three mapped sheets in one shared pass each
+    update_sheet_for_week(
+        workbook, config["sheets"]["channel_campaign_metrics"],
+        "publisher_spend_mapping", publisher_spend, week_uid
+    )
+    update_sheet_for_week(
+        workbook, config["sheets"]["overall_metrics"],
+        "platform_spend_mapping", platform_spend_values, week_uid
+    )
+    update_sheet_for_week(
+        workbook, config["sheets"]["mae_audience_level"],
+        "audience_mapping", platform_adset_spend_dict, week_uid
+    )
     
     # Save the workbook
     print(f"Saving workbook: {base_path + output_report}")
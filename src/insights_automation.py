@@ -1,15 +1,36 @@
 import json
 import os
 import re # For parsing LLM responses and formatting
+import sys # sys.intern for the shared-string pool
 import math # For number formatting
-from pptx import Presentation
-from pptx.util import Pt # To set font size
-from pptx.dml.color import RGBColor # To set font color
+from xml.sax.saxutils import escape as _xml_escape
 import openpyxl # Assuming fetch_excel_data uses this
+from openpyxl.utils.cell import range_boundaries # For batching chart ranges
+from collections import OrderedDict, namedtuple # Workbook LRU cache / mapping index
+from functools import lru_cache # Memoized markdown-table formatting
+import hashlib # Content digests for the formatted-context cache
+import time # Expiry checks for the on-disk LLM response cache
+from openpyxl.utils.cell import coordinate_to_tuple # For SAX-style range streaming
+from openpyxl.styles.numbers import is_date_format # Date-style detection for the streamer
+from concurrent.futures import ThreadPoolExecutor # For parallel chart fetches
+import threading # To guard the workbook cache across fetch threads
+import zipfile # To stream worksheet XML without openpyxl Cell objects
+from itertools import chain, islice, repeat, zip_longest # For combining and padding row data
+from xml.etree import ElementTree as ET # iterparse for the streaming path
+import numpy as np # Vectorized percentage classification
 import pandas as pd # For saving output CSV
 from dotenv import load_dotenv # Assuming F4 uses this
-from openai import AzureOpenAI, RateLimitError, APIConnectionError, AuthenticationError, APIError # Assuming F4 uses this
+from openai import AzureOpenAI, AsyncAzureOpenAI, RateLimitError, APIConnectionError, AuthenticationError, APIError # Assuming F4 uses this
+import asyncio # Concurrent LLM fan-out across independent prompts
+import httpx # Shared connection pool / HTTP2 for the OpenAI client (ships with openai)
 import pprint # Import pprint for better dictionary printing
+try:
+    import orjson # Optional C-accelerated parser for the (large) unified config
+except ImportError:
+    orjson = None
+import logging # Hot-path diagnostics go through a logger, not print
+
+log = logging.getLogger(__name__)
 
 # ==============================================================================
 # ASSUMED EXISTING FUNCTIONS (Ensure these are defined in your script)
@@ -34,10 +55,10 @@ def function_1_extract_pptx(slide_number_1_based, prs, current_slide_data):
         }
     """
     if slide_number_1_based < 1 or slide_number_1_based > len(prs.slides):
-        print(f"Error: Slide number {slide_number_1_based} is out of range (1-{len(prs.slides)}).")
+        log.error("Slide number %s is out of range (1-%s).", slide_number_1_based, len(prs.slides))
         return None
 
-    print(f"\n--- Processing Slide {slide_number_1_based} ---")
+    log.debug("--- Processing Slide %s ---", slide_number_1_based)
     slide = prs.slides[slide_number_1_based - 1]
     # Making a copy of input slide_data_dict
     slide_data = current_slide_data
@@ -51,52 +72,241 @@ def function_1_extract_pptx(slide_number_1_based, prs, current_slide_data):
     try:
         if slide.shapes.title:
             slide_data["title"] = slide.shapes.title.text.strip()
-            print(f"  Extracted Title: '{slide_data['title']}'")
+            log.debug("  Extracted Title: %r", slide_data["title"])
     except Exception as e:
-        print(f"  Warning: Could not extract standard title. {e}")
+        log.warning("Could not extract standard title. %s", e)
 
     # Extract Text, Tables, and Identify Charts
+    # Hoist the boilerplate thresholds; prs.slide_height does not change per shape
+    top_threshold = prs.slide_height * 0.85
+    height_threshold = prs.slide_height * 0.15
+
+    # Try the bulk XPath path first; it skips python-pptx Shape wrapper
+    # construction entirely. Fall back to the shape loop on any surprise.
+    try:
+        _extract_shapes_fast(slide, slide_data, top_threshold, height_threshold)
+        log.debug("  Finished processing Slide %s. Found %s text boxes, %s tables, %s charts.", slide_number_1_based, len(slide_data["text_content"]), len(slide_data["tables_data"]), len(slide_data["chart_identifiers"]))
+        return slide_data
+    except Exception as e:
+        log.warning("Fast XML extraction failed (%s); falling back to shape iteration.", e)
+        slide_data["text_content"] = []
+        slide_data["tables_data"] = []
+        slide_data["chart_identifiers"] = []
+
     for shape in slide.shapes:
+        # A shape is only ever one of text frame / table / chart, so classify
+        # once with if/elif instead of probing every attribute on every shape
         # --- Text Extraction (with basic filtering) ---
-        if shape.has_text_frame and shape.text.strip():
-            # Avoid duplicating title if already extracted
-            is_title = slide_data["title"] and shape.has_text_frame and shape.text.strip() == slide_data["title"]
-            # Basic filter: Ignore if likely a small element or part of slide master/footer (heuristic)
-            # You might need more sophisticated filtering based on position, size, or style
-            is_likely_boilerplate = shape.top > (prs.slide_height * 0.85) or shape.height < (prs.slide_height * 0.15)
-            if not is_title and not is_likely_boilerplate:
-                slide_data["text_content"].append(shape.text.strip())
-                print(f"  Extracted Text: '{shape.text.strip()[:50]}...'") # For debugging
+        if shape.has_text_frame:
+            # shape.text walks every paragraph/run, so read it exactly once
+            text = shape.text.strip()
+            if text:
+                # Avoid duplicating title if already extracted
+                is_title = slide_data["title"] and text == slide_data["title"]
+                # Basic filter: Ignore if likely a small element or part of slide master/footer (heuristic)
+                # You might need more sophisticated filtering based on position, size, or style
+                # Placeholder-less shapes can report top/height as None; read each
+                # position property once and treat None as "not boilerplate"
+                top = shape.top
+                height = shape.height
+                is_likely_boilerplate = (
+                    (top is not None and top > top_threshold)
+                    or (height is not None and height < height_threshold)
+                )
+                if not is_title and not is_likely_boilerplate:
+                    slide_data["text_content"].append(text)
+                    log.debug("  Extracted Text: %r...", text[:50]) # For debugging
 
         # --- Table Extraction ---
-        if shape.has_table:
-            print(f"  Found Table: Shape Name='{shape.name}', ID={shape.shape_id}")
+        elif shape.has_table:
+            # Bind name/table once; each attribute read walks into lxml
+            name = shape.name
+            log.debug("  Found Table: Shape Name=%r, ID=%s", name, shape.shape_id)
             table_data = []
             table = shape.table
             try:
                 for row in table.rows:
-                    row_data = [cell.text_frame.text.strip() for cell in row.cells]
+                    row_data = [cell.text.strip() for cell in row.cells]
                     table_data.append(row_data)
                 slide_data["tables_data"].append(table_data)
             except Exception as e:
-                 print(f"    Warning: Could not fully extract table data for shape '{shape.name}'. Error: {e}")
+                 log.warning("Could not fully extract table data for shape %r. Error: %s", name, e)
 
         # --- Chart Identification ---
-        if shape.has_chart:
+        elif shape.has_chart:
+            # Same idea for charts: one chart/name/id read, reused throughout
+            name = shape.name
+            sid = shape.shape_id
             chart_title = None
             try:
-                if shape.chart.has_title and shape.chart.chart_title.has_text_frame:
-                    chart_title = shape.chart.chart_title.text_frame.text.strip()
+                ch = shape.chart
+                if ch.has_title:
+                    ct = ch.chart_title
+                    if ct.has_text_frame:
+                        chart_title = ct.text_frame.text.strip()
             except Exception:
                  # Ignore errors getting chart title for now
                  pass
-            identifier_info = {"name": shape.name, "id": shape.shape_id, "title": chart_title}
+            identifier_info = {"name": name, "id": sid, "title": chart_title}
             slide_data["chart_identifiers"].append(identifier_info)
-            print(f"  Found Chart: Name='{identifier_info['name']}', ID={identifier_info['id']}, Title='{identifier_info['title']}'")
+            log.debug("  Found Chart: Name=%r, ID=%s, Title=%r", name, sid, chart_title)
 
-    print(f"  Finished processing Slide {slide_number_1_based}. Found {len(slide_data['text_content'])} text boxes, {len(slide_data['tables_data'])} tables, {len(slide_data['chart_identifiers'])} charts.")
+    log.debug("  Finished processing Slide %s. Found %s text boxes, %s tables, %s charts.", slide_number_1_based, len(slide_data["text_content"]), len(slide_data["tables_data"]), len(slide_data["chart_identifiers"]))
     return slide_data
 
+# LRU cache of opened read-only workbooks keyed by (abs path, mtime) so each
+# chart range fetch does not re-unzip and re-parse the whole XLSX. Evicted (or
+# stale) workbooks are closed on the way out.
+_WB_CACHE = OrderedDict()
+_WB_CACHE_MAXSIZE = 4
+_WB_CACHE_LOCK = threading.Lock()
+
+# Resolved defined-name destinations keyed by (abs path, mtime, range_name),
+# so repeated named ranges skip the defined-name walk.
+_DEFINED_NAME_CACHE = {}
+
+def _get_cached_workbook(file_path):
+    """
+    Return a cached read-only workbook for the file, loading it on first use.
+
+    Each cache entry also carries a sheet-name -> Worksheet dict so repeated
+    lookups reuse the same ReadOnlyWorksheet object (and its parse state)
+    instead of re-resolving it per chart.
+
+    Args:
+        file_path (str): Path to the Excel file.
+
+    Returns:
+        tuple: (cache key, openpyxl Workbook, {sheet_name: Worksheet} cache).
+    """
+    key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+    with _WB_CACHE_LOCK:
+        entry = _WB_CACHE.get(key)
+        if entry is not None:
+            _WB_CACHE.move_to_end(key)
+            return (key,) + entry
+
+    # Load outside the lock so parallel fetches of different files overlap
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    with _WB_CACHE_LOCK:
+        # Re-check: another thread may have loaded the same file while we
+        # were parsing; keep its entry so the duplicate can be closed below
+        # rather than overwriting it and leaking its zip handle
+        entry = _WB_CACHE.get(key)
+        if entry is None:
+            _WB_CACHE[key] = (workbook, {})
+            if len(_WB_CACHE) > _WB_CACHE_MAXSIZE:
+                _, (evicted, _) = _WB_CACHE.popitem(last=False)
+                evicted.close()
+            return (key,) + _WB_CACHE[key]
+        _WB_CACHE.move_to_end(key)
+    workbook.close()
+    return (key,) + entry
+
+def _get_cached_sheet(file_path, sheet_name):
+    """Return (cache key, workbook, worksheet), binding the sheet once per file."""
+    key, workbook, sheets = _get_cached_workbook(file_path)
+    worksheet = sheets.get(sheet_name)
+    if worksheet is None:
+        worksheet = workbook[sheet_name]
+        sheets[sheet_name] = worksheet
+    return key, workbook, worksheet
+
+def close_cached_workbooks():
+    """
+    Close and drop every cached workbook.
+
+    The cache owns workbook lifetimes, so this (plus LRU eviction) is the
+    single close site — fetchers never call workbook.close() themselves,
+    which keeps new return branches from leaking zipfile handles.
+    """
+    with _WB_CACHE_LOCK:
+        while _WB_CACHE:
+            _, (workbook, _) = _WB_CACHE.popitem(last=False)
+            try:
+                workbook.close()
+            except Exception:
+                pass
+
+# python-pptx renders an <a:br/> line break as a vertical tab in shape.text
+# and cell.text; the fast path must emit the same character or tokens on
+# either side of a break fuse together ("Weekly" + "KPI" -> "WeeklyKPI")
+_BREAK_CHAR = "\x0b"
+
+def _paragraph_text(p):
+    """Concatenate one a:p's run text, mapping <a:br/> to the break char."""
+    return "".join(
+        _BREAK_CHAR if node.tag.endswith('}br') else (node.text or "")
+        for node in p.xpath('.//a:t | .//a:br')
+    )
+
+def _extract_shapes_fast(slide, slide_data, top_threshold, height_threshold):
+    """
+    Bulk-extract text, tables, and chart identifiers with lxml XPath.
+
+    Queries the slide's shape tree directly instead of iterating
+    `slide.shapes`, which constructs a python-pptx wrapper object per shape.
+    Text mirrors shape.text / cell.text exactly: paragraphs join with
+    newlines and <a:br/> becomes the break character. Placeholders that
+    inherit their geometry from the layout carry no a:xfrm in the slide
+    XML; those resolve top/height through python-pptx (built lazily, once
+    per slide) so the boilerplate filter sees the inherited values.
+    Chart titles are left as None here; they live in separate chart parts
+    and are only used as display fallbacks.
+
+    Args:
+        slide: The python-pptx Slide object.
+        slide_data (dict): Output dictionary (modified in place).
+        top_threshold / height_threshold: Boilerplate-position cutoffs in EMU.
+    """
+    sp_tree = slide.shapes._spTree
+    inherited_geometry = None # lazy {shape id: (top, height)} via python-pptx
+
+    # Text: one paragraph-joined string per p:sp, mirroring shape.text
+    for sp in sp_tree.xpath('./p:sp'):
+        text = "\n".join(_paragraph_text(p) for p in sp.xpath('.//a:p')).strip()
+        if not text:
+            continue
+        is_title = slide_data["title"] and text == slide_data["title"]
+        offsets = sp.xpath('./p:spPr/a:xfrm/a:off/@y')
+        extents = sp.xpath('./p:spPr/a:xfrm/a:ext/@cy')
+        if offsets and extents:
+            top = int(offsets[0])
+            height = int(extents[0])
+        else:
+            # No explicit xfrm: a placeholder inheriting from the layout.
+            # python-pptx walks the inheritance chain, so borrow its answer
+            # rather than letting slide-number/footer text slip past the filter
+            if inherited_geometry is None:
+                inherited_geometry = {
+                    shape.shape_id: (shape.top, shape.height)
+                    for shape in slide.shapes
+                }
+            sp_id = int(sp.xpath('./p:nvSpPr/p:cNvPr/@id')[0])
+            top, height = inherited_geometry[sp_id]
+        is_likely_boilerplate = (
+            (top is not None and top > top_threshold)
+            or (height is not None and height < height_threshold)
+        )
+        if not is_title and not is_likely_boilerplate:
+            slide_data["text_content"].append(text)
+
+    # Tables: a:tbl -> rows (a:tr) -> cells (a:tc), cell paragraphs joined
+    # with newlines like cell.text so multi-line headers keep their shape
+    for tbl in sp_tree.xpath('.//a:tbl'):
+        slide_data["tables_data"].append([
+            ["\n".join(_paragraph_text(p) for p in tc.xpath('.//a:p')).strip()
+             for tc in tr.xpath('./a:tc')]
+            for tr in tbl.xpath('./a:tr')
+        ])
+
+    # Charts: graphic frames carrying a c:chart reference
+    for frame in sp_tree.xpath('./p:graphicFrame[.//c:chart]'):
+        cnvpr = frame.xpath('./p:nvGraphicFramePr/p:cNvPr')[0]
+        slide_data["chart_identifiers"].append(
+            {"name": cnvpr.get("name"), "id": int(cnvpr.get("id")), "title": None}
+        )
+
 def fetch_excel_data(file_path, sheet_name, excel_range=None, range_name=None):
     """
     Fetches data from a specified range or named range in an Excel file using pandas.
@@ -112,41 +322,44 @@ def fetch_excel_data(file_path, sheet_name, excel_range=None, range_name=None):
               or None if an error occurs. Returns empty list if range is empty.
     """
     if not (excel_range or range_name):
-        print(f"  [fetch_excel_data] Error: Provide excel_range or range_name.")
+        log.error("[fetch_excel_data] Provide excel_range or range_name.")
         return None
     if not sheet_name:
-        print(f"  [fetch_excel_data] Error: Sheet name not provided.")
+        log.error("[fetch_excel_data] Sheet name not provided.")
         return None
     if not os.path.exists(file_path):
-        print(f"  [fetch_excel_data] Error: File not found at '{file_path}'.")
+        log.error("[fetch_excel_data] File not found at %r.", file_path)
         return None
 
     target_range = range_name if range_name else excel_range
-    print(f"  [fetch_excel_data] Attempting: File='{os.path.basename(file_path)}', Sheet='{sheet_name}', Range='{target_range}'")
+    log.debug("[fetch_excel_data] Attempting: File=%r, Sheet=%r, Range=%r", os.path.basename(file_path), sheet_name, target_range)
 
     try:
-        workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
-        sheet = workbook[sheet_name]
+        # Reuse the already-parsed workbook across range fetches; loading is
+        # the dominant cost and the same file is hit once per chart range
+        cache_key, workbook, sheet = _get_cached_sheet(file_path, sheet_name)
 
         data_rows = []
         target_cells = None
 
         if range_name:
-            if range_name in workbook.defined_names:
-                 dest = workbook.defined_names[range_name].attr_text
-                 # Limitation: Simple parsing assuming format like 'SheetName!A1:B5' or just 'A1:B5' if on the target sheet
-                 if '!' in dest:
-                     ws_title, range_str = dest.split('!', 1)
-                     if ws_title != sheet_name:
-                         print("  [fetch_excel_data] Warning: Named range points to a different sheet. Ignoring.")
-                         workbook.close() # Close workbook to avoid leaks
-                 else:
-                     range_str = dest
-                 target_cells = sheet[range_str]
+            dn_key = cache_key + (range_name,)
+            dest = _DEFINED_NAME_CACHE.get(dn_key)
+            if dest is None:
+                if range_name in workbook.defined_names:
+                    dest = workbook.defined_names[range_name].attr_text
+                    _DEFINED_NAME_CACHE[dn_key] = dest
+                else:
+                    log.error("[fetch_excel_data] Named range %r not found.", range_name)
+                    return None
+            # Limitation: Simple parsing assuming format like 'SheetName!A1:B5' or just 'A1:B5' if on the target sheet
+            if '!' in dest:
+                ws_title, range_str = dest.split('!', 1)
+                if ws_title != sheet_name:
+                    log.warning("[fetch_excel_data] Named range points to a different sheet. Ignoring.")
             else:
-                 print(f"  [fetch_excel_data] Error: Named range '{range_name}' not found.")
-                 workbook.close()
-                 return None
+                range_str = dest
+            target_cells = sheet[range_str]
         elif excel_range:
             target_cells = sheet[excel_range]
 
@@ -158,21 +371,352 @@ def fetch_excel_data(file_path, sheet_name, excel_range=None, range_name=None):
                 for row_tuple in target_cells:
                     data_rows.append([cell.value for cell in row_tuple])
 
-        workbook.close() # Close workbook when done
-
         # Convert potential NaNs/NoneTypes if needed for consistency downstream (e.g., replace None with "")
         # data_rows = [[str(cell) if cell is not None else "" for cell in row] for row in data_rows]
 
-        print(f"    Successfully read {len(data_rows)} rows x {len(data_rows[0]) if data_rows else 0} columns.")
+        log.debug("    Successfully read %s rows x %s columns.", len(data_rows), len(data_rows[0]) if data_rows else 0)
         return data_rows # Return list of lists
 
     except KeyError:
-        print(f"  [fetch_excel_data] Error: Sheet '{sheet_name}' not found in '{file_path}'.")
+        log.error("[fetch_excel_data] Sheet %r not found in %r.", sheet_name, file_path)
+        return None
+    except Exception as e:
+        log.error("[fetch_excel_data] Error reading Excel data: %s", e)
+        return None
+
+def _fetch_range_fast(file_path, sheet_name, excel_range):
+    """
+    Specialized fetch for the common case: a plain A1:B5 range, no named range.
+
+    Skips fetch_excel_data's defined-name resolution and the Cell-vs-tuple
+    isinstance dispatch — a multi-cell A1 range is known to yield rows of
+    tuples from the cached worksheet.
+
+    Returns:
+        list: List of lists of cell values, or None on error.
+    """
+    try:
+        _, _, sheet = _get_cached_sheet(file_path, sheet_name)
+        return [[cell.value for cell in row_tuple] for row_tuple in sheet[excel_range]]
+    except KeyError:
+        log.error("[_fetch_range_fast] Sheet %r not found in %r.", sheet_name, file_path)
+        return None
+    except Exception as e:
+        log.error("[_fetch_range_fast] Error reading %r: %s", excel_range, e)
+        return None
+
+# Shared-string tables keyed by (abs path, mtime) for the streaming reader
+_SST_CACHE = {}
+
+# Date-styled cellXfs indices keyed by (abs path, mtime); see _get_date_style_ids
+_DATE_STYLE_CACHE = {}
+
+# Builtin number-format ids Excel renders as dates/times (ECMA-376 18.8.30)
+_BUILTIN_DATE_FMT_IDS = frozenset(range(14, 23)) | frozenset(range(45, 48))
+
+_SSML_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+
+def _sheet_xml_name(zf, sheet_name):
+    """Resolve a worksheet name to its XML member path inside the xlsx zip."""
+    workbook_root = ET.fromstring(zf.read("xl/workbook.xml"))
+    rel_id = None
+    for sheet_el in workbook_root.iter(f"{_SSML_NS}sheet"):
+        if sheet_el.get("name") == sheet_name:
+            rel_id = sheet_el.get(f"{_REL_NS}id")
+            break
+    if rel_id is None:
+        return None
+
+    rels_root = ET.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels_root:
+        if rel.get("Id") == rel_id:
+            target = rel.get("Target")
+            return target if target.startswith("xl/") else "xl/" + target
+    return None
+
+def _get_shared_strings(zf, cache_key):
+    """
+    Parse (and cache) the workbook's shared string table.
+
+    Short entries (axis labels, header cells) are sys.intern'd so repeated
+    fetches hand out the same str objects — fewer allocations, and identity-
+    fast dict lookups if the labels become keys downstream. The table is
+    frozen into a tuple so every fetch indexes the same immutable pool.
+    """
+    shared = _SST_CACHE.get(cache_key)
+    if shared is None:
+        entries = []
+        if "xl/sharedStrings.xml" in zf.namelist():
+            root = ET.fromstring(zf.read("xl/sharedStrings.xml"))
+            for si in root:
+                entries.append("".join(t.text or "" for t in si.iter(f"{_SSML_NS}t")))
+        shared = tuple(sys.intern(s) if len(s) < 64 else s for s in entries)
+        _SST_CACHE[cache_key] = shared
+    return shared
+
+def _get_date_style_ids(zf, cache_key):
+    """
+    Parse (and cache) the cellXfs style indices that render as dates.
+
+    Covers the builtin date/time numFmtIds plus custom numFmts whose format
+    code openpyxl classifies as a date. Numeric cells carrying one of these
+    styles hold raw Excel serials in the XML.
+    """
+    ids = _DATE_STYLE_CACHE.get(cache_key)
+    if ids is None:
+        found = set()
+        if "xl/styles.xml" in zf.namelist():
+            root = ET.fromstring(zf.read("xl/styles.xml"))
+            custom = {
+                num_fmt.get("numFmtId"): num_fmt.get("formatCode")
+                for num_fmt in root.iter(f"{_SSML_NS}numFmt")
+            }
+            cell_xfs = root.find(f"{_SSML_NS}cellXfs")
+            if cell_xfs is not None:
+                for idx, xf in enumerate(cell_xfs.findall(f"{_SSML_NS}xf")):
+                    fmt_id = xf.get("numFmtId", "0")
+                    if int(fmt_id) in _BUILTIN_DATE_FMT_IDS or is_date_format(custom.get(fmt_id)):
+                        found.add(str(idx))
+        ids = frozenset(found)
+        _DATE_STYLE_CACHE[cache_key] = ids
+    return ids
+
+def _stream_range(file_path, sheet_name, min_col, min_row, max_col, max_row):
+    """
+    Stream a rectangular cell range straight from the worksheet XML.
+
+    Walks `xl/worksheets/sheetN.xml` with `iterparse` and fills a 2D grid of
+    plain values, skipping openpyxl's per-cell ReadOnlyCell allocation — the
+    dominant cost of its read-only path on wide ranges. Stops as soon as the
+    row cursor passes the bounding box.
+
+    Limitation: date-styled cells are stored as raw serial numbers in the
+    XML and this reader does not convert them. If the box contains one, it
+    returns None so the caller's openpyxl fallback (which maps serials to
+    datetimes) serves the range — both paths then yield identical data.
+
+    Returns:
+        list: 2D list of values covering the requested box (None for empty
+              cells), or None if the sheet could not be resolved or the box
+              contains date-styled cells.
+    """
+    cache_key = (os.path.abspath(file_path), os.path.getmtime(file_path))
+    with zipfile.ZipFile(file_path) as zf:
+        sheet_member = _sheet_xml_name(zf, sheet_name)
+        if sheet_member is None:
+            return None
+        shared = _get_shared_strings(zf, cache_key)
+        date_styles = _get_date_style_ids(zf, cache_key)
+
+        grid = [[None] * (max_col - min_col + 1) for _ in range(max_row - min_row + 1)]
+        cell_tag = f"{_SSML_NS}c"
+        row_tag = f"{_SSML_NS}row"
+        value_tag = f"{_SSML_NS}v"
+        with zf.open(sheet_member) as stream:
+            for _, elem in ET.iterparse(stream, events=("end",)):
+                if elem.tag == cell_tag:
+                    ref = elem.get("r")
+                    if ref:
+                        row_idx, col_idx = coordinate_to_tuple(ref)
+                        if min_row <= row_idx <= max_row and min_col <= col_idx <= max_col:
+                            cell_type = elem.get("t")
+                            if cell_type == "inlineStr":
+                                value = "".join(t.text or "" for t in elem.iter(f"{_SSML_NS}t"))
+                            else:
+                                v = elem.find(value_tag)
+                                if v is None or v.text is None:
+                                    value = None
+                                elif cell_type == "s":
+                                    value = shared[int(v.text)]
+                                elif cell_type == "str":
+                                    value = v.text
+                                elif elem.get("s") in date_styles:
+                                    # Raw date serial; defer to the openpyxl
+                                    # fallback so the caller gets datetimes
+                                    log.debug("[_stream_range] Date-styled cell %s in %r; deferring to openpyxl.", ref, sheet_name)
+                                    return None
+                                else:
+                                    try:
+                                        number = float(v.text)
+                                        value = int(number) if number.is_integer() else number
+                                    except ValueError:
+                                        value = v.text
+                            grid[row_idx - min_row][col_idx - min_col] = value
+                    elem.clear()
+                elif elem.tag == row_tag:
+                    past_box = int(elem.get("r", 0)) > max_row
+                    elem.clear()
+                    if past_box:
+                        break
+        return grid
+
+def fetch_excel_ranges(file_path, sheet_name, ranges):
+    """
+    Fetches several A1-style ranges from one worksheet in a single row pass.
+
+    Computes the union bounding box of all requested ranges, streams it once
+    with `iter_rows(values_only=True)` (each `sheet[range]` access on a
+    read-only sheet re-scans the worksheet XML), and slices every range out
+    of the buffered rows.
+
+    Args:
+        file_path (str): Path to the Excel file.
+        sheet_name (str): Name of the worksheet.
+        ranges (list): A1-style range strings (e.g., ["A1:B5", "D1:D5"]).
+
+    Returns:
+        list: One list-of-lists per requested range, in order, or None if the
+              sheet or file could not be read.
+    """
+    if not ranges:
+        return []
+    if not os.path.exists(file_path):
+        log.error("[fetch_excel_ranges] File not found at %r.", file_path)
+        return None
+
+    try:
+        # (min_col, min_row, max_col, max_row) per range, plus the union box
+        bounds = [range_boundaries(r) for r in ranges]
+        union_min_col = min(b[0] for b in bounds)
+        union_min_row = min(b[1] for b in bounds)
+        union_max_col = max(b[2] for b in bounds)
+        union_max_row = max(b[3] for b in bounds)
+
+        # Prefer the SAX streamer, which avoids per-cell object allocation;
+        # fall back to openpyxl's iter_rows if the sheet XML cannot be walked
+        buffer = None
+        try:
+            buffer = _stream_range(
+                file_path, sheet_name,
+                union_min_col, union_min_row, union_max_col, union_max_row
+            )
+        except Exception as stream_error:
+            log.warning("[fetch_excel_ranges] Streaming read failed (%s); falling back to openpyxl.", stream_error)
+
+        if buffer is None:
+            _, _, sheet = _get_cached_sheet(file_path, sheet_name)
+            buffer = [
+                row for row in sheet.iter_rows(
+                    min_row=union_min_row, max_row=union_max_row,
+                    min_col=union_min_col, max_col=union_max_col,
+                    values_only=True
+                )
+            ]
+
+        results = []
+        for min_col, min_row, max_col, max_row in bounds:
+            results.append([
+                list(buffer[row - union_min_row][min_col - union_min_col:max_col - union_min_col + 1])
+                for row in range(min_row, max_row + 1)
+            ])
+        log.debug("[fetch_excel_ranges] Read %s ranges from %r in one pass.", len(ranges), sheet_name)
+        return results
+
+    except KeyError:
+        log.error("[fetch_excel_ranges] Sheet %r not found in %r.", sheet_name, file_path)
+        return None
+    except Exception as e:
+        log.error("[fetch_excel_ranges] Error reading Excel ranges: %s", e)
         return None
+
+def _fetch_chart_excel_data(final_excel_file, sheet, excel_range, excel_ranges, range_name):
+    """
+    Fetches (and, for multi-range charts, column-wise combines) one chart's Excel data.
+
+    Thread-safe worker used by `function_2_add_chart_data`; the underlying
+    workbook cache is lock-guarded, and XLSX decompression releases the GIL,
+    so several charts can fetch concurrently.
+
+    Returns:
+        list: Combined list-of-lists of cell values, or None on failure.
+    """
+    try:
+        if excel_ranges and isinstance(excel_ranges, (list, tuple)):
+            log.debug("    Fetching multiple ranges from: File=%r, Sheet=%r, Ranges=%s", os.path.basename(final_excel_file), sheet, excel_ranges)
+            # One sheet pass for all ranges instead of a scan per range
+            datasets = fetch_excel_ranges(final_excel_file, sheet, list(excel_ranges)) or []
+
+            if datasets:
+                # Combine datasets row-wise by concatenating columns;
+                # zip_longest drives the padding in C instead of index math
+                empty_rows = [
+                    [""] * (len(d[0]) if d and len(d[0]) > 0 else 1) for d in datasets
+                ]
+                return [
+                    list(chain.from_iterable(
+                        ["" if v is None else v for v in row] if row is not None else empty_rows[ds_idx]
+                        for ds_idx, row in enumerate(rows)
+                    ))
+                    for rows in zip_longest(*datasets)
+                ]
+            return None
+
+        # Single range or named range
+        log.debug("    Fetching from: File=%r, Sheet=%r, Range=%r", os.path.basename(final_excel_file), sheet, excel_range or range_name)
+        if excel_range and not range_name and ':' in excel_range:
+            # Common case: plain multi-cell A1 range — take the branch-free path
+            return _fetch_range_fast(final_excel_file, sheet, excel_range)
+        return fetch_excel_data(
+            file_path=final_excel_file,
+            sheet_name=sheet,
+            excel_range=excel_range,
+            range_name=range_name
+        )
     except Exception as e:
-        print(f"  [fetch_excel_data] Error reading Excel data: {e}")
+        log.error("Error fetching excel ranges: %s", e)
         return None
 
+# Pre-extracted excel_source fields for one chart definition
+ExcelSource = namedtuple(
+    "ExcelSource", ["sheet", "excel_range", "excel_ranges", "range_name", "excel_file_path"]
+)
+
+# Prepared per-slide chart indexes keyed by id(mapping_data); the mapping
+# object itself is held in the value so the id stays valid
+_PREPARED_MAPPINGS = {}
+
+def prepare_mapping(mapping_data):
+    """
+    Build (and memoize) a per-slide chart index for a loaded mapping.
+
+    Resolves each slide's `defs_by_name` dict and pre-extracts every chart's
+    `excel_source` fields into an `ExcelSource` tuple, so the per-chart loop
+    in `function_2_add_chart_data` does no repeated `.get(...)` chains.
+
+    Args:
+        mapping_data (dict): The loaded mapping JSON data.
+
+    Returns:
+        dict: Slide-number string to {"charts": [...], "defs_by_name": {name: (definition, ExcelSource)}}.
+    """
+    cached = _PREPARED_MAPPINGS.get(id(mapping_data))
+    if cached is not None and cached[0] is mapping_data:
+        return cached[1]
+
+    prepared = {}
+    for slide_key, slide_rules in mapping_data.get("slides", {}).items():
+        charts = slide_rules.get("charts", [])
+        defs_by_name = {}
+        for definition in charts:
+            shape_name = definition.get("shape_name")
+            if shape_name and shape_name not in defs_by_name:
+                source_info = definition.get("excel_source", {})
+                defs_by_name[shape_name] = (
+                    definition,
+                    ExcelSource(
+                        source_info.get("sheet"),
+                        source_info.get("excel_range"),
+                        source_info.get("excel_ranges"),
+                        source_info.get("range_name"),
+                        source_info.get("excel_file_path")
+                    )
+                )
+        prepared[slide_key] = {"charts": charts, "defs_by_name": defs_by_name}
+
+    _PREPARED_MAPPINGS[id(mapping_data)] = (mapping_data, prepared)
+    return prepared
+
 # --- Function 2: Add Chart Data from Excel using Mapping ---
 def function_2_add_chart_data(slide_number, mapping_data, slide_data):
     # if slide_number == 7:
@@ -188,12 +732,12 @@ def function_2_add_chart_data(slide_number, mapping_data, slide_data):
         slide_data (dict): Dictionary possibly containing 'chart_identifiers' key.
                            This dictionary is modified IN PLACE.
     """
-    print(f"\n--- Step 2: Fetching Excel data for Slide {slide_number} charts ---")
+    log.debug("--- Step 2: Fetching Excel data for Slide %s charts ---", slide_number)
     charts_excel_data_list = [] # This will store results for charts successfully processed
     charts_found_on_slide = slide_data.get("chart_identifiers", [])
 
     if not charts_found_on_slide:
-        print("  No chart identifiers found in slide_data (output from Step 1). Skipping Excel fetch.")
+        log.debug("  No chart identifiers found in slide_data (output from Step 1). Skipping Excel fetch.")
         slide_data["charts_excel_data"] = charts_excel_data_list # Ensure key exists, even if empty
         return slide_data # Modify in place, no explicit return needed, but can return slide_data
 
@@ -202,109 +746,78 @@ def function_2_add_chart_data(slide_number, mapping_data, slide_data):
     # print(f"Mapping data: \n{mapping_data}\n")
     # print(default_excel_file_path)
     if not default_excel_file_path:
-        print("  Warning: No top-level 'excel_path' file path defined in mapping JSON. Cannot fetch Excel data.")
+        log.warning("No top-level 'excel_path' file path defined in mapping JSON. Cannot fetch Excel data.")
         slide_data["charts_excel_data"] = charts_excel_data_list
         return slide_data
 
-    # Find the mapping rules specific to the current slide number
-    slide_mapping_rules = None
-    slide_mapping_rules = mapping_data.get("slides", {}).get(str(slide_number))
+    # Find the mapping rules specific to the current slide number, using the
+    # memoized per-slide index so the excel_source dicts are parsed only once
+    slide_rules = prepare_mapping(mapping_data).get(str(slide_number))
 
-    if not slide_mapping_rules:
-        print(f"  No mapping rules found in JSON for slide {slide_number}. Skipping Excel fetch.")
+    if not slide_rules:
+        log.debug("  No mapping rules found in JSON for slide %s. Skipping Excel fetch.", slide_number)
         slide_data["charts_excel_data"] = charts_excel_data_list
         return slide_data
 
-    mapped_chart_definitions = slide_mapping_rules.get("charts", [])
+    mapped_chart_definitions = slide_rules["charts"]
     if not mapped_chart_definitions:
-        print(f"  No 'charts' defined in mapping for slide {slide_number}. Skipping Excel fetch.")
+        log.debug("  No 'charts' defined in mapping for slide %s. Skipping Excel fetch.", slide_number)
         slide_data["charts_excel_data"] = charts_excel_data_list
         return slide_data
 
     # --- Match found PPTX charts to mapping definitions and fetch data ---
-    print(f"  Comparing {len(charts_found_on_slide)} found charts against {len(mapped_chart_definitions)} mapping definitions.")
+    log.debug("  Comparing %s found charts against %s mapping definitions.", len(charts_found_on_slide), len(mapped_chart_definitions))
+    defs_by_name = slide_rules["defs_by_name"]
+
+    fetch_tasks = [] # (found_chart_name, found_chart, matched_definition, fetch args...)
     for found_chart in charts_found_on_slide:
         found_chart_name = found_chart.get("name")
         if not found_chart_name:
-            print(f"  Skipping PPTX chart (ID: {found_chart.get('id')}, Title: '{found_chart.get('title')}') - lacks shape name.")
+            log.debug("  Skipping PPTX chart (ID: %s, Title: %r) - lacks shape name.", found_chart.get("id"), found_chart.get("title"))
             continue
 
-        matched_definition = None
-        for definition in mapped_chart_definitions:
-            if definition.get("shape_name") == found_chart_name:
-                matched_definition = definition
-                break
+        matched = defs_by_name.get(found_chart_name)
 
-        if matched_definition:
-            print(f"  Found mapping for chart '{found_chart_name}'.")
-            excel_source_info = matched_definition.get("excel_source", {})
-            sheet = excel_source_info.get("sheet")
+        if matched:
+            matched_definition, source = matched
+            log.debug("  Found mapping for chart %r.", found_chart_name)
             # Support both singular 'excel_range' and plural 'excel_ranges' as some mappings use a list
-            excel_range = excel_source_info.get("excel_range")
-            excel_ranges = excel_source_info.get("excel_ranges")
-            range_name = excel_source_info.get("range_name")
-            # print(f"\n\n\n\n\n\nMAPPING DATA INCOMING: \n{excel_source_info}\nSheet: {sheet}\nexcel_range: {excel_range}\nexcel_ranges: {excel_ranges}\nrange_name: {range_name}")
+            sheet = source.sheet
+            excel_range = source.excel_range
+            excel_ranges = source.excel_ranges
+            range_name = source.range_name
 
             # --- Determine Final Excel File Path ---
             # Check for a specific path within the chart's mapping first
-            specific_excel_file = excel_source_info.get("excel_file_path") # Or .get("file") if you use that key
-            final_excel_file = specific_excel_file if specific_excel_file else default_excel_file_path
+            final_excel_file = source.excel_file_path if source.excel_file_path else default_excel_file_path
 
             if not final_excel_file:
-                print(f"    Warning: No Excel file path determined for chart '{found_chart_name}' (specific or default). Skipping fetch.")
+                log.warning("No Excel file path determined for chart %r (specific or default). Skipping fetch.", found_chart_name)
                 continue
 
             # Must have sheet and at least one range type (support singular 'excel_range', plural 'excel_ranges', or named 'range_name')
             if not sheet or not (excel_range or excel_ranges or range_name):
-                print(f"    Warning: Incomplete Excel source details (sheet/range) in mapping for '{found_chart_name}'. Skipping fetch.")
+                log.warning("Incomplete Excel source details (sheet/range) in mapping for %r. Skipping fetch.", found_chart_name)
                 continue
 
-            # Call the helper function to get data. Support multiple ranges if provided.
-            excel_data = None
-            try:
-                if excel_ranges and isinstance(excel_ranges, (list, tuple)):
-                    print(f"    Fetching multiple ranges from: File='{os.path.basename(final_excel_file)}', Sheet='{sheet}', Ranges={excel_ranges}")
-                    datasets = []
-                    for r in excel_ranges:
-                        d = fetch_excel_data(file_path=final_excel_file, sheet_name=sheet, excel_range=r, range_name=None)
-                        if d is None:
-                            print(f"      Warning: fetch_excel_data returned None for range '{r}'. Skipping this range.")
-                            continue
-                        datasets.append(d)
-
-                    if datasets:
-                        # Combine datasets row-wise by concatenating columns. Pad shorter datasets.
-                        max_rows = max(len(d) for d in datasets)
-                        col_counts = [len(d[0]) if d and len(d[0])>0 else 0 for d in datasets]
-                        combined = []
-                        for row_idx in range(max_rows):
-                            combined_row = []
-                            for ds_idx, ds in enumerate(datasets):
-                                if row_idx < len(ds):
-                                    row = ds[row_idx]
-                                    combined_row += ["" if v is None else v for v in row]
-                                else:
-                                    # pad with empty strings for missing rows
-                                    combined_row += [""] * (col_counts[ds_idx] if col_counts[ds_idx] > 0 else 1)
-                            combined.append(combined_row)
-                        excel_data = combined
-                    else:
-                        excel_data = None
-                else:
-                    # Single range or named range
-                    print(f"    Fetching from: File='{os.path.basename(final_excel_file)}', Sheet='{sheet}', Range='{excel_range or range_name}'")
-                    excel_data = fetch_excel_data(
-                        file_path=final_excel_file,
-                        sheet_name=sheet,
-                        excel_range=excel_range,
-                        range_name=range_name
-                    )
-            except Exception as e:
-                print(f"    ERROR fetching excel ranges: {e}")
-                excel_data = None
+            # Queue the fetch; all charts on the slide are fetched concurrently below
+            fetch_tasks.append((
+                found_chart_name, found_chart, matched_definition,
+                final_excel_file, sheet, excel_range, excel_ranges, range_name
+            ))
+
+        else:
+            log.debug("  Info: PPTX chart %r on slide %s is not defined in the mapping JSON.", found_chart_name, slide_number)
 
+    # Fetch all chart data in parallel; zip decompression and XML parsing
+    # release the GIL, so threads overlap the per-chart parse cost
+    if fetch_tasks:
+        with ThreadPoolExecutor(max_workers=min(8, len(fetch_tasks))) as executor:
+            fetched = list(executor.map(lambda t: _fetch_chart_excel_data(*t[3:]), fetch_tasks))
+
+        for (found_chart_name, found_chart, matched_definition, *_), excel_data in zip(fetch_tasks, fetched):
             if excel_data is not None:
-                print(f"    Successfully fetched data for '{found_chart_name}'.")
+                log.debug("    Successfully fetched data for %r.", found_chart_name)
                 chart_output = {
                     "identifier": found_chart_name, # Use shape name as identifier
                     "mapped_title": matched_definition.get("title", found_chart.get("title", "N/A")),
@@ -313,32 +826,21 @@ def function_2_add_chart_data(slide_number, mapping_data, slide_data):
                 }
                 charts_excel_data_list.append(chart_output)
             else:
-                print(f"    Failed to fetch or process Excel data for '{found_chart_name}'.")
-
-        else:
-            print(f"  Info: PPTX chart '{found_chart_name}' on slide {slide_number} is not defined in the mapping JSON.")
+                log.warning("Failed to fetch or process Excel data for %r.", found_chart_name)
 
     slide_data["charts_excel_data"] = charts_excel_data_list
-    print(f"--- Finished Step 2 (Modified): Added data for {len(charts_excel_data_list)} mapped charts to 'slide_data'. ---")
+    log.debug("--- Finished Step 2 (Modified): Added data for %s mapped charts to 'slide_data'. ---", len(charts_excel_data_list))
     return slide_data # Return modified slide_data (though modified in place)
 
 # --- Helper Function to Format List of Lists as Markdown Table ---
-def format_as_markdown_table(data_list_of_lists):
-    """
-    Formats a list of lists (where the first list is headers) into a Markdown table string.
-
-    Args:
-        data_list_of_lists (list): A list where the first item is the header row (list of strings),
-                                   and subsequent items are data rows (list of strings/numbers/None).
-
-    Returns:
-        str: A Markdown formatted table string, or a note if data is empty/invalid.
-    """
-    if not data_list_of_lists or len(data_list_of_lists) < 1:
+@lru_cache(maxsize=256)
+def _format_table_cached(frozen_rows):
+    """ Cached worker for format_as_markdown_table; takes a tuple of row tuples. """
+    if not frozen_rows:
         return " (No data available or header missing)\n"
 
-    header = data_list_of_lists[0]
-    data_rows = data_list_of_lists[1:]
+    header = frozen_rows[0]
+    data_rows = frozen_rows[1:]
     num_columns = len(header)
 
     if num_columns == 0:
@@ -350,69 +852,381 @@ def format_as_markdown_table(data_list_of_lists):
     separator_str = "|-" + "-|".join(['---'] * num_columns) + "-|" # Simple separator
 
     # Create data row strings: | Val1 | Val2 | ... |
-    row_strs = []
-    for row in data_rows:
-        # Ensure row has same number of elements as header for a clean table
-        # Replace None with empty string for display
-        formatted_row = [str(cell).strip() if cell is not None else "" for cell in row]
-        # Pad or truncate row if necessary (simple padding shown)
-        if len(formatted_row) < num_columns:
-            formatted_row += [""] * (num_columns - len(formatted_row))
-        elif len(formatted_row) > num_columns:
-            formatted_row = formatted_row[:num_columns] # Truncate
-
-        row_strs.append("| " + " | ".join(formatted_row) + " |")
+    # islice over chain(row, repeat(None)) pads short rows and truncates long
+    # ones to the header width in one pass, without building interim lists
+    row_strs = (
+        "| " + " | ".join(
+            str(cell).strip() if cell is not None else ""
+            for cell in islice(chain(row, repeat(None)), num_columns)
+        ) + " |"
+        for row in data_rows
+    )
 
     # Add a note if there were data rows, otherwise indicate header only
-    if not data_rows:
-        return "\n".join([header_str, separator_str, "(No data rows)"]) + "\n"
+    lines = [header_str, separator_str]
+    if data_rows:
+        lines.extend(row_strs)
     else:
-        return "\n".join([header_str, separator_str] + row_strs) + "\n"
+        lines.append("(No data rows)")
+    return "\n".join(lines) + "\n"
+
+def format_as_markdown_table(data_list_of_lists):
+    """
+    Formats a list of lists (where the first list is headers) into a Markdown table string.
+
+    Results are memoized on the frozen row content, so retries and slide-2
+    snippet derivation that re-feed the same chart data skip the rebuild.
+
+    Args:
+        data_list_of_lists (list): A list where the first item is the header row (list of strings),
+                                   and subsequent items are data rows (list of strings/numbers/None).
+
+    Returns:
+        str: A Markdown formatted table string, or a note if data is empty/invalid.
+    """
+    frozen_rows = tuple(tuple(row) for row in data_list_of_lists) if data_list_of_lists else ()
+    try:
+        return _format_table_cached(frozen_rows)
+    except TypeError:
+        # Unhashable cell values: fall through to the uncached worker
+        return _format_table_cached.__wrapped__(frozen_rows)
+
+# Formatted slide contexts keyed by content digest (bounded, LRU eviction)
+_CONTEXT_FMT_CACHE = OrderedDict()
+_CONTEXT_FMT_CACHE_MAXSIZE = 64
 
 def format_context_data(slide_num, slide_data):
     """ Formats data for ONE slide into a string for the LLM prompt. """
-    context_str = ""
+    # Re-prompts over the same slide data (retries, snippet derivation) reuse
+    # the formatted string via a digest of the serialized input
+    digest = None
+    try:
+        digest = hashlib.blake2b(
+            json.dumps((slide_num, slide_data), sort_keys=True, default=str).encode()
+        ).digest()
+        cached = _CONTEXT_FMT_CACHE.get(digest)
+        if cached is not None:
+            _CONTEXT_FMT_CACHE.move_to_end(digest)
+            return cached
+    except (TypeError, ValueError):
+        pass
+
+    # Accumulate parts and join once at the end; += on a growing string
+    # re-copies the whole buffer for every table/chart appended
+    parts = []
     if slide_data:
         # Simplified formatting - use format_as_markdown_table for tables/charts
-        context_str += f"\n**Data from Slide {slide_num} ({slide_data.get('title', 'No Title')})**\n"
+        parts.append(f"\n**Data from Slide {slide_num} ({slide_data.get('title', 'No Title')})**\n")
         if slide_data.get("text_content"):
-            context_str += "* Texts:\n" + "\n".join([f"  - {t}" for t in slide_data["text_content"]]) + "\n"
+            parts.append("* Texts:\n" + "\n".join([f"  - {t}" for t in slide_data["text_content"]]) + "\n")
         if slide_data.get("tables_data"):
-            context_str += "* Tables:\n"
+            parts.append("* Tables:\n")
             for i, tbl in enumerate(slide_data["tables_data"]):
-                 context_str += f"  - Table {i+1}:\n{format_as_markdown_table(tbl)}\n"
+                 parts.append(f"  - Table {i+1}:\n{format_as_markdown_table(tbl)}\n")
         if slide_data.get("charts_excel_data"): # Data from F2
-            context_str += "* Chart Data (from Linked Excel Source):\n"
+            parts.append("* Chart Data (from Linked Excel Source):\n")
             for i, chrt in enumerate(slide_data["charts_excel_data"]):
-                 context_str += f"  - Chart {i+1} ({chrt.get('mapped_title', 'N/A')}):\n{format_as_markdown_table(chrt.get('data',[]))}\n"
+                 parts.append(f"  - Chart {i+1} ({chrt.get('mapped_title', 'N/A')}):\n{format_as_markdown_table(chrt.get('data',[]))}\n")
         # Add extracted chart descriptions if you implement that instead of F2's Excel fetch
     else:
-         context_str += f"\n**Data from Slide {slide_num} (Not Available)**\n"
-    return context_str
+         parts.append(f"\n**Data from Slide {slide_num} (Not Available)**\n")
+
+    result = "".join(parts)
+    if digest is not None:
+        _CONTEXT_FMT_CACHE[digest] = result
+        if len(_CONTEXT_FMT_CACHE) > _CONTEXT_FMT_CACHE_MAXSIZE:
+            _CONTEXT_FMT_CACHE.popitem(last=False)
+    return result
+
+# Disk cache of raw LLM responses keyed by (model, prompt digest). Re-runs of
+# an unchanged deck (common while tweaking the PPT template) skip the API
+# round-trip entirely; the 24h expiry keeps responses from leaking across
+# reporting weeks. Only the raw text is cached, so parsing/format changes
+# take effect immediately on the next run.
+_LLM_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".ppt_automation", "llm_cache")
+_LLM_CACHE_EXPIRE_SECONDS = 86400
+
+def _llm_cache_path(model_id, prompt):
+    """ Cache file path for one (model, prompt) pair. """
+    digest = hashlib.blake2b(prompt.encode("utf-8")).hexdigest()
+    return os.path.join(_LLM_CACHE_DIR, f"{model_id}_{digest}.txt")
+
+def _llm_cache_get(model_id, prompt):
+    """ Returns the cached response for (model, prompt), or None if absent/expired. """
+    try:
+        path = _llm_cache_path(model_id, prompt)
+        if time.time() - os.path.getmtime(path) < _LLM_CACHE_EXPIRE_SECONDS:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+    except OSError:
+        pass
+    return None
+
+def _llm_cache_put(model_id, prompt, response_text):
+    """ Stores a response; cache write failures never break the pipeline. """
+    try:
+        os.makedirs(_LLM_CACHE_DIR, exist_ok=True)
+        with open(_llm_cache_path(model_id, prompt), "w", encoding="utf-8") as f:
+            f.write(response_text)
+    except OSError:
+        pass
+
+def build_openai_client():
+    """
+    Builds an AzureOpenAI client backed by a persistent httpx connection pool.
+
+    Keepalive connections (and HTTP/2 multiplexing where the optional `h2`
+    package is installed) mean the TLS handshake is paid once for the whole
+    multi-slide run instead of once per LLM call.
+
+    Returns:
+        AzureOpenAI: The initialized client.
+    """
+    limits = httpx.Limits(max_keepalive_connections=16)
+    try:
+        http_client = httpx.Client(http2=True, limits=limits)
+    except ImportError:
+        # http2=True needs the `h2` extra; keepalive pooling alone still helps
+        http_client = httpx.Client(limits=limits)
+    return AzureOpenAI(
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_API_ENDOINT"),
+        api_version="2024-10-01-preview", # Automatic prompt caching needs 2024-10+
+        http_client=http_client,
+    )
+
+def build_async_openai_client():
+    """ Async twin of build_openai_client(): one pooled client for gathered calls. """
+    limits = httpx.Limits(max_keepalive_connections=16)
+    try:
+        http_client = httpx.AsyncClient(http2=True, limits=limits)
+    except ImportError:
+        http_client = httpx.AsyncClient(limits=limits)
+    return AsyncAzureOpenAI(
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_API_ENDOINT"),
+        api_version="2024-10-01-preview", # Automatic prompt caching needs 2024-10+
+        http_client=http_client,
+    )
+
+async def generate_all_insights(prompts, model_id="gpt-4o-mini", temperature=0.3, max_tokens_response=300, max_concurrency=10):
+    """
+    Runs a batch of independent prompts against the LLM concurrently.
+
+    Network RTT and provider-side decode time overlap across prompts instead
+    of summing; the semaphore caps in-flight requests, and rate-limited calls
+    back off exponentially before retrying.
+
+    Args:
+        prompts (dict): Mapping of caller-chosen key -> prompt string.
+        model_id (str): The OpenAI model deployment ID.
+        temperature (float): Controls creativity/randomness (0.0-2.0).
+        max_tokens_response (int): Maximum tokens allowed per response.
+        max_concurrency (int): Maximum simultaneous requests.
+
+    Returns:
+        dict: Mapping of key -> response text (or None on failure).
+    """
+    client = build_async_openai_client()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def bounded_call(prompt):
+        cached = _llm_cache_get(model_id, prompt)
+        if cached is not None:
+            return cached
+        async with semaphore:
+            for attempt in range(3):
+                try:
+                    response = await client.chat.completions.create(
+                        model=model_id,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        max_tokens=max_tokens_response,
+                        n=1,
+                        stop=None
+                    )
+                    text = response.choices[0].message.content.strip()
+                    _llm_cache_put(model_id, prompt, text)
+                    return text
+                except RateLimitError:
+                    await asyncio.sleep(2 ** attempt)
+                except Exception as e:
+                    print(f"  Async LLM call failed: {e}")
+                    return None
+            print("  Async LLM call gave up after repeated rate limits.")
+            return None
+
+    # Identical prompts (possible when chart branches repeat a payload)
+    # collapse to one in-flight request; every key still gets its answer
+    unique_prompts = {}
+    for key, prompt in prompts.items():
+        unique_prompts.setdefault(prompt, []).append(key)
+
+    try:
+        results = await asyncio.gather(*(bounded_call(p) for p in unique_prompts))
+    finally:
+        await client.close()
+    responses = {}
+    for prompt, text in zip(unique_prompts, results):
+        for key in unique_prompts[prompt]:
+            responses[key] = text
+    return responses
+
+def generate_all_insights_batch(prompts, model_id="gpt-4o-mini", temperature=0.3, max_tokens_response=300, completion_window="24h", poll_interval=30):
+    """
+    Runs a batch of independent prompts through the provider's Batch API.
+
+    For overnight/scheduled deck generation latency is irrelevant: one JSONL
+    upload carries every prompt, the provider queues them server-side at
+    roughly half the synchronous price, and the run sidesteps per-minute
+    rate limits entirely. Blocks (polling) until the batch finishes.
+
+    Args:
+        prompts (dict): Mapping of caller-chosen key -> prompt string.
+        model_id (str): The OpenAI model deployment ID.
+        temperature (float): Controls creativity/randomness (0.0-2.0).
+        max_tokens_response (int): Maximum tokens allowed per response.
+        completion_window (str): Batch API completion window (e.g. "24h").
+        poll_interval (int): Seconds between batch status polls.
+
+    Returns:
+        dict: Mapping of key -> response text (or None on failure).
+    """
+    results = {}
+    pending = {}  # custom_id -> ([original keys], prompt); duplicates collapse
+    custom_id_by_prompt = {}
+    for key, prompt in prompts.items():
+        cached = _llm_cache_get(model_id, prompt)
+        if cached is not None:
+            results[key] = cached
+        elif prompt in custom_id_by_prompt:
+            pending[custom_id_by_prompt[prompt]][0].append(key)
+        else:
+            custom_id = str(key)
+            custom_id_by_prompt[prompt] = custom_id
+            pending[custom_id] = ([key], prompt)
+
+    if pending:
+        client = build_openai_client()
+        lines = [
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/chat/completions",
+                "body": {
+                    "model": model_id,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": temperature,
+                    "max_tokens": max_tokens_response,
+                },
+            })
+            for custom_id, (_, prompt) in pending.items()
+        ]
+        try:
+            batch_file = client.files.create(
+                file=("insight_prompts.jsonl", "\n".join(lines).encode("utf-8")),
+                purpose="batch",
+            )
+            batch = client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/chat/completions",
+                completion_window=completion_window,
+            )
+            print(f"  Submitted batch {batch.id} with {len(pending)} prompts...")
+            while batch.status in ("validating", "in_progress", "finalizing"):
+                time.sleep(poll_interval)
+                batch = client.batches.retrieve(batch.id)
+            if batch.status != "completed":
+                print(f"  Batch {batch.id} ended with status '{batch.status}'.")
+            if batch.output_file_id:
+                output = client.files.content(batch.output_file_id)
+                for line in output.text.splitlines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    entry = pending.get(record.get("custom_id"))
+                    if entry is None:
+                        continue
+                    keys, prompt = entry
+                    response = record.get("response") or {}
+                    if response.get("status_code") == 200:
+                        text = response["body"]["choices"][0]["message"]["content"].strip()
+                        _llm_cache_put(model_id, prompt, text)
+                        for key in keys:
+                            results[key] = text
+        except (APIError, APIConnectionError, AuthenticationError, OSError) as e:
+            print(f"  Batch API run failed: {e}")
+
+    # Keys the batch could not answer come back as None, like the async runner
+    for key in prompts:
+        results.setdefault(key, None)
+    return results
+
+# Lazily-built fallback client shared by all calls that don't pass their own
+_FALLBACK_CLIENT = None
+
+def _default_client():
+    """ Returns (building on first use) the shared fallback AzureOpenAI client. """
+    global _FALLBACK_CLIENT
+    if _FALLBACK_CLIENT is None:
+        _FALLBACK_CLIENT = build_openai_client()
+    return _FALLBACK_CLIENT
+
+def _stream_llm_deltas(response, model_id=None, prompt=None):
+    """
+    Yields text deltas from a streaming Chat Completions response.
 
-def function_4_call_llm(prompt_string, client, model_id="gpt-4o-mini", temperature=0.3, max_tokens_response=500):
+    When model_id/prompt are given, the joined response is written to the
+    disk cache once the stream is exhausted, so streamed calls get the same
+    re-run behaviour as blocking ones.
+    """
+    parts = []
+    for chunk in response:
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            yield delta
+    if model_id and prompt:
+        _llm_cache_put(model_id, prompt, "".join(parts).strip())
+
+def function_4_call_llm(prompt_string, client, model_id="gpt-4o-mini", temperature=0.3, max_tokens_response=300, stream=False):
     """
     Sends the formatted prompt to the specified OpenAI Chat Completions model
     and returns the generated text content (insights).
 
+    The client should come from build_openai_client() so all calls in a run
+    share one keepalive connection pool; if None is passed the module-level
+    fallback from _default_client() is used.
+
     Args:
         prompt_string (str): The complete prompt generated.
         client (AzureOpenAI): The initialized AzureOpenAI client object.
         model_id (str): The OpenAI model deployment ID.
         temperature (float): Controls creativity/randomness (0.0-2.0).
         max_tokens_response (int): Maximum number of tokens allowed for the response.
+        stream (bool): When True, returns a generator of text deltas instead of
+                       the full string, so the caller can overlap postprocessing
+                       with the remaining decode time. Default False.
 
     Returns:
         str: The generated text insights from the LLM, or None if an error occurs.
+             In streaming mode, a generator yielding str deltas (or None on error).
     """
     print("\n--- Step 4: Calling OpenAI API ---")
     if not client:
-        print("  Error: Invalid OpenAI client provided to function_4_call_llm.")
-        return None
+        try:
+            client = _default_client()
+        except Exception as e:
+            print(f"  Error: No OpenAI client provided and fallback init failed: {e}")
+            return None
     if not prompt_string or not isinstance(prompt_string, str):
         print("  Error: Invalid prompt string provided. Cannot make API call.")
         return None
     print(f"  Model: '{model_id}', Temperature: {temperature}, Max Tokens: {max_tokens_response}")
+    cached = _llm_cache_get(model_id, prompt_string)
+    if cached is not None:
+        print("--- Finished Step 4: Served response from disk cache. ---")
+        return iter((cached,)) if stream else cached
     try:
         messages_for_api = [{"role": "user", "content": prompt_string}]
         response = client.chat.completions.create(
@@ -421,11 +1235,19 @@ def function_4_call_llm(prompt_string, client, model_id="gpt-4o-mini", temperatu
             temperature=temperature,
             max_tokens=max_tokens_response,
             n=1,
-            stop=None
+            stop=None,
+            stream=stream
         )
+        if stream:
+            # Hand deltas to the caller as they arrive; no usage stats in this mode
+            print("--- Step 4: Streaming response from LLM. ---")
+            return _stream_llm_deltas(response, model_id=model_id, prompt=prompt_string)
         generated_insights = response.choices[0].message.content.strip()
+        _llm_cache_put(model_id, prompt_string, generated_insights)
         usage = response.usage
-        print(f"  API Call Success. Usage: Prompt={usage.prompt_tokens}, Completion={usage.completion_tokens}, Total={usage.total_tokens}")
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+        print(f"  API Call Success. Usage: Prompt={usage.prompt_tokens} (cached {cached_tokens}), Completion={usage.completion_tokens}, Total={usage.total_tokens}")
         print("--- Finished Step 4: Received response from LLM successfully. ---")
         return generated_insights
     except AuthenticationError as e: print(f"  FATAL API Error: OpenAI Authentication Failed (Status Code: {e.status_code}). Check API key. Error: {e}"); return None
@@ -443,16 +1265,26 @@ def function_4_call_llm(prompt_string, client, model_id="gpt-4o-mini", temperatu
 # NEW/UPDATED HELPER FUNCTIONS FOR FORMATTING
 # ==============================================================================
 
+# Precompiled matcher + multiplier table for format_large_number; avoids the
+# per-call .replace() chain (three intermediate strings per token)
+_NUM_RE = re.compile(r'^([+-]?\d[\d,]*\.?\d*)([KM]?)$')
+_NUM_MUL = {"K": 1_000, "M": 1_000_000, "": 1}
+
+# Number tokens eligible for K/M abbreviation (used by parse_llm_response)
+_ABBREV_NUM_RE = re.compile(r'(?<![KM])\b(\d{1,3}(?:,\d{3})+|\d{4,})\b(?![KM])')
+
 def format_large_number(num_str):
     """Formats a number string into K/M format if large enough."""
     try:
-        num = float(num_str.replace(',', '').replace('K','000').replace('M','000000'))
+        match = _NUM_RE.match(num_str.strip())
+        if not match: return num_str
+        num = float(match.group(1).replace(',', '')) * _NUM_MUL[match.group(2)]
         if abs(num) >= 1_000_000: return f"{num / 1_000_000:.1f}M"
         elif abs(num) >= 1_000: return f"{num / 1000:.0f}K"
         else:
             if num == math.floor(num): return str(int(num))
             else: return f"{num:.1f}"
-    except (ValueError, TypeError): return num_str
+    except (ValueError, TypeError, AttributeError): return num_str
 
 def format_percentage(perc_match):
     """
@@ -475,10 +1307,152 @@ def format_percentage(perc_match):
     except (ValueError, TypeError):
         return perc_str # Return original if conversion fails
 
+def _format_percentages(text):
+    """
+    Formats every percentage in the text in a single splice pass.
+
+    Collects the matches with finditer, classifies all parsed values against
+    the +/-120%% bound as one NumPy comparison, and reassembles the string by
+    slicing between match spans - no per-match Python callback frame.
+    """
+    if '%' not in text:
+        return text
+    matches = list(_PERCENT_RE.finditer(text))
+    if not matches:
+        return text
+    vals = np.fromiter((float(m.group(2)) for m in matches), dtype=np.float64, count=len(matches))
+    hi = vals > 120
+    lo = vals < -120
+    pieces = []
+    last = 0
+    for i, m in enumerate(matches):
+        pieces.append(text[last:m.start()])
+        if hi[i]:
+            pieces.append("a significant increase")
+        elif lo[i]:
+            pieces.append("a significant decrease")
+        else:
+            pieces.append(m.group(1))
+        last = m.end()
+    pieces.append(text[last:])
+    return "".join(pieces)
+
+def _abbreviate_numbers(text):
+    """ Splice-based twin of _format_percentages for K/M number abbreviation. """
+    # The pattern needs a thousands separator or a 4+ digit run; both imply
+    # at least one digit, so a digit-free text can skip the regex scan
+    if not any(ch.isdigit() for ch in text):
+        return text
+    matches = list(_ABBREV_NUM_RE.finditer(text))
+    if not matches:
+        return text
+    pieces = []
+    last = 0
+    for m in matches:
+        pieces.append(text[last:m.start()])
+        pieces.append(format_large_number(m.group(1)))
+        last = m.end()
+    pieces.append(text[last:])
+    return "".join(pieces)
+
 # ==============================================================================
 # UPDATED build_prompt_for_slide FUNCTION (Numbered Lists, Grammar Fix)
 # ==============================================================================
 
+# --- Prompt fragments shared by every build_prompt_for_slide call; built once
+# at import instead of re-allocating identical blobs per slide ---
+_BASE_INSTRUCTIONS = """You are an expert analyst generating insights for a presentation slide.
+Analyze the provided data context specified below.
+Generate insights strictly based ONLY on the provided data and follow the specific output requirements."""
+
+_OUTPUT_REQUIREMENTS_TEMPLATE = """
+**Output Requirements:**
+1. Generate the 'Key Highlights' first, following the structure implied by the template below. Generate 3-4 numbered bullet points (e.g., '1.', '2.') with a line break between each point. Use professional, readable full sentences.
+2. Fill the `[...]` placeholders within the Key Highlights using specific information derived *solely* from the 'Provided Data Context' or 'Additional Context'. Use 'N/A' if data is missing. For placeholders like '[Change Description]', provide the specific percentage change (e.g., "+15% WoW", "-8%") if available and within +/-120%, otherwise use a qualitative phrase like "a significant increase", "a slight decrease", "minimal change", etc.
+3. **CRITICAL:** Ensure the final Key Highlights output text does NOT contain any square brackets `[` or `]` or the heading "Key Highlights:".
+4. After the Key Highlights, on a **NEW LINE**, provide the 'Summary Phrase'. Format it EXACTLY like this: `Summary Phrase: [Concise phrase summarizing the most impactful highlight, max 10 words.]`
+{context_extraction_instruction}""" # Include context extraction placeholder
+
+_FINAL_REQUEST = """**Generate the Key Highlights first (as a numbered list with line breaks), then the Summary Phrase on a new line below it (and the Context Snippet if applicable):**"""
+
+_CHART_BASE_INSTRUCTIONS_FMT = """You are an expert analyst generating insights for a specific chart ('{chart_title}') on a presentation slide.
+Analyze ONLY the provided data context for this chart below. Starting from the latest week, just analyze the previous 4 weeks. Also display week number as last 2 digits instead of using 'K'; eg: for 202506, display just Week 06. Try to avoid commas, semicolons, fullstops and give a complete sentence
+Generate 1-2 concise, readable numbered bullet points (e.g., '1.', '2.') summarizing the key findings from ONLY this chart. Ensure a line break between points."""
+
+_CHART_TEMPLATE = """1. [Insight 1 about this specific chart]
+2. [Optional Insight 2 about this specific chart]""" # Numbered template
+
+_CHART_OUTPUT_REQUIREMENTS = """
+**Output Requirements:**
+1. Generate 1-2 numbered bullet points summarizing the key findings from ONLY the provided chart data. Ensure a line break between points.
+2. Use professional, readable full sentences, not just phrases.
+3. **CRITICAL:** Ensure the final output text does NOT contain any square brackets `[` or `]`. Do not include any heading like "Key Highlights:". """
+
+_CHART_FINAL_REQUEST = "**Generate the required numbered bullet points now:**"
+
+# Per-slide prompt specs registered once at import:
+# (template, sub_topic_focus, extra_instructions format template,
+#  context_extraction_instruction). Prompt dispatch is a dict lookup plus a
+# single .format for slide 2's snippets, instead of an if/elif chain that
+# rebuilt each literal per call.
+_GENERIC_TEMPLATE = """1. [Insight 1]
+2. [Insight 2]
+3. [Insight 3]
+4. [Optional Insight 4]"""
+
+_SLIDE_2_EXTRA_INSTRUCTIONS_FMT = """Synthesize information. For Installs, specify the primary driver (organic/owned/paid). Then add relevant context:
+- If organic driven, mention OS: {organic_os}
+- If owned driven, mention top campaign: {owned_campaign}
+- If paid driven, mention media partner: {paid_partner}
+Fill these details using the provided context snippets. State 'N/A' if a snippet is missing or not applicable."""
+
+_SLIDE_PROMPT_SPECS = {
+    2: ("""1. App Installs: Installs showed [Change Description] at [Value], driven by [Primary Driver]. [Specific driver context based on snippets below].
+2. WAU: WAU showed [Change Description] at [Value].
+3. [Add key insight 3]
+4. [Optional key insight 4]""",
+        "Weekly Performance including App Installs (Organic/Owned/Paid drivers) and WAU.",
+        _SLIDE_2_EXTRA_INSTRUCTIONS_FMT,
+        ""),
+    3: ("""1. [Provide key insight about installs breakout, focusing on OS if relevant for organic].
+2. [Add key insight 2]
+3. [Add key insight 3]""",
+        "Installs Breakout details, particularly the Operating System driving organic performance if applicable.",
+        "",
+        "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the primary Operating System (OS) driving organic installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Organic OS: [Detected OS Name or N/A]'."),
+    4: ("""1. Overall: Owned installs showed [Change Description] at [Value].
+2. Key Driver Highlight: The primary driver for owned installs growth/decline was [Identify main driver/campaign]. [Optional: Add brief detail].
+3. [Add key insight 3]
+4. [Optional key insight 4]""",
+        "Overall Owned Installs performance vs WoW, and identify the primary 2-3 drivers or campaigns influencing growth/decline.",
+        "",
+        "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the specific campaign name witnessing the highest growth for owned installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Owned Campaign: [Campaign Name or N/A]'."),
+    5: ("""1. Overall: Total paid installs showed [Change Description] at [Value].
+2. Primary Driver: The primary driver for paid spend/installs was [Identify main driver/partner/campaign], driven by [Specific reason if available].
+3. [Add key insight 3]
+4. [Optional key insight 4]""",
+        "Overall Paid Installs performance vs WoW, and identify the primary driver (e.g., Google) and any reason for change (e.g., spend increase).",
+        "",
+        "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the primary media partner associated with paid installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Paid Partner: [Partner Name or N/A]'."),
+    6: ("""1. Sessions/Cost: [Value] sessions at [Cost/Session Value] $/Session and CPA of [CPA Value].
+2. Re-engagement: [Value] users re-engaged ([Value]% of WAU).
+3. [Add key insight 3]
+4. [Optional key insight 4]""",
+        "Sessions, cost per session, CPA, and re-engagement rate.",
+        "",
+        ""),
+    8: ("""1. Segment Growth: Reactivated users showed [Change Description], New users [Change Description], Current users [Change Description] YoY(compare the current reporting week with last year's same week+1, eg: 202506 vs 2020407; also display week number as last 2 digits instead of using 'K'; eg: for 202506, display just Week 06. Try to avoid commas, semicolons, fullstops and give a complete sentence).
+2. [Add key insight 2 about segments]
+3. [Add key insight 3 about segments]""",
+        "Segment-wise user growth (Reactivated, New, Current) compared YoY.",
+        "",
+        ""),
+    # --- Slides 7 and 10 are handled chart-by-chart; 1/9/11 are generic ---
+    1: (_GENERIC_TEMPLATE, "General summary of key data points.", "", ""),
+    9: (_GENERIC_TEMPLATE, "General summary of key data points.", "", ""),
+    11: (_GENERIC_TEMPLATE, "General summary of key data points.", "", ""),
+}
+
 def build_prompt_for_slide(slide_num, slide_data, slide_2_context_snippets=None, chart_focus=None):
     """
     Builds the LLM prompt dynamically. Handles chart-specific focus.
@@ -493,148 +1467,161 @@ def build_prompt_for_slide(slide_num, slide_data, slide_2_context_snippets=None,
     Returns:
         str: The constructed prompt string, or None if slide not handled.
     """
-    print(f"  Building prompt for Slide {slide_num}" + (f" (Focus: Chart '{chart_focus.get('title', chart_focus.get('name', 'Unknown'))}')" if chart_focus else ""))
-
-    # --- Base Instructions ---
-    base_instructions = """You are an expert analyst generating insights for a presentation slide.
-Analyze the provided data context specified below.
-Generate insights strictly based ONLY on the provided data and follow the specific output requirements."""
+    log.debug("  Building prompt for Slide %s%s", slide_num, f" (Focus: Chart {chart_focus.get('title', chart_focus.get('name', 'Unknown'))!r})" if chart_focus else "")
 
-    # --- Default values ---
+    # --- Default values (shared fragments live at module scope) ---
+    base_instructions = _BASE_INSTRUCTIONS
     template = ""
     sub_topic_focus = ""
     extra_instructions = ""
     context_extraction_instruction = ""
-    # --- UPDATED Output Requirements ---
-    output_requirements = """
-**Output Requirements:**
-1. Generate the 'Key Highlights' first, following the structure implied by the template below. Generate 3-4 numbered bullet points (e.g., '1.', '2.') with a line break between each point. Use professional, readable full sentences.
-2. Fill the `[...]` placeholders within the Key Highlights using specific information derived *solely* from the 'Provided Data Context' or 'Additional Context'. Use 'N/A' if data is missing. For placeholders like '[Change Description]', provide the specific percentage change (e.g., "+15% WoW", "-8%") if available and within +/-120%, otherwise use a qualitative phrase like "a significant increase", "a slight decrease", "minimal change", etc.
-3. **CRITICAL:** Ensure the final Key Highlights output text does NOT contain any square brackets `[` or `]` or the heading "Key Highlights:".
-4. After the Key Highlights, on a **NEW LINE**, provide the 'Summary Phrase'. Format it EXACTLY like this: `Summary Phrase: [Concise phrase summarizing the most impactful highlight, max 10 words.]`
-{context_extraction_instruction}""" # Include context extraction placeholder
-
-    final_request = """**Generate the Key Highlights first (as a numbered list with line breaks), then the Summary Phrase on a new line below it (and the Context Snippet if applicable):**"""
+    output_requirements = _OUTPUT_REQUIREMENTS_TEMPLATE
+    final_request = _FINAL_REQUEST
 
     # --- Handle Chart-Specific Prompts (Slides 7, 10) ---
     if chart_focus:
         chart_name = chart_focus.get('name', 'this chart')
         chart_title = chart_focus.get('title', chart_name)
-        base_instructions = f"""You are an expert analyst generating insights for a specific chart ('{chart_title}') on a presentation slide.
-Analyze ONLY the provided data context for this chart below. Starting from the latest week, just analyze the previous 4 weeks. Also display week number as last 2 digits instead of using 'K'; eg: for 202506, display just Week 06. Try to avoid commas, semicolons, fullstops and give a complete sentence
-Generate 1-2 concise, readable numbered bullet points (e.g., '1.', '2.') summarizing the key findings from ONLY this chart. Ensure a line break between points."""
+        base_instructions = _CHART_BASE_INSTRUCTIONS_FMT.format(chart_title=chart_title)
         sub_topic_focus = f"Key takeaways from chart '{chart_title}'"
-        template = """1. [Insight 1 about this specific chart]
-2. [Optional Insight 2 about this specific chart]""" # Numbered template
+        template = _CHART_TEMPLATE
         # Override output requirements
-        output_requirements = """
-**Output Requirements:**
-1. Generate 1-2 numbered bullet points summarizing the key findings from ONLY the provided chart data. Ensure a line break between points.
-2. Use professional, readable full sentences, not just phrases.
-3. **CRITICAL:** Ensure the final output text does NOT contain any square brackets `[` or `]`. Do not include any heading like "Key Highlights:". """
-        final_request = "**Generate the required numbered bullet points now:**"
+        output_requirements = _CHART_OUTPUT_REQUIREMENTS
+        final_request = _CHART_FINAL_REQUEST
         context_data_str = f"\n**Data Context (Chart: {chart_title} on Slide {slide_num})**\n"
-        context_data_str += format_as_markdown_table(chart_focus.get('data', [])) # Assumed helper
+        # No rows means nothing to serialize; skip the markdown pass entirely
+        chart_data = chart_focus.get('data')
+        context_data_str += format_as_markdown_table(chart_data) if chart_data else "(No data rows provided.)"
 
     # --- Handle Full Slide Prompts (Other Slides) ---
     else:
-        # --- UPDATED Templates with Numbering and [Change Description] ---
-        if slide_num == 2:
-            template = """1. App Installs: Installs showed [Change Description] at [Value], driven by [Primary Driver]. [Specific driver context based on snippets below].
-2. WAU: WAU showed [Change Description] at [Value].
-3. [Add key insight 3]
-4. [Optional key insight 4]"""
-            sub_topic_focus = "Weekly Performance including App Installs (Organic/Owned/Paid drivers) and WAU."
-            extra_instructions = """Synthesize information. For Installs, specify the primary driver (organic/owned/paid). Then add relevant context:
-- If organic driven, mention OS: {organic_os}
-- If owned driven, mention top campaign: {owned_campaign}
-- If paid driven, mention media partner: {paid_partner}
-Fill these details using the provided context snippets. State 'N/A' if a snippet is missing or not applicable."""
+        spec = _SLIDE_PROMPT_SPECS.get(slide_num)
+        if spec is None:
+            log.warning("No specific template logic defined for Slide %s. Skipping prompt generation.", slide_num)
+            return None
+        if not slide_data:
+            # Nothing extracted for this slide; formatting an empty context
+            # would only produce a prompt the LLM can't answer
+            log.warning("No extracted data for Slide %s. Skipping prompt generation.", slide_num)
+            return None
+        template, sub_topic_focus, extra_instructions_fmt, context_extraction_instruction = spec
+        if template is _GENERIC_TEMPLATE:
+            log.debug("  Using generic template for Slide %s.", slide_num)
+        if extra_instructions_fmt:
             snippets = slide_2_context_snippets or {}
-            extra_instructions = extra_instructions.format(
+            extra_instructions = extra_instructions_fmt.format(
                 organic_os=snippets.get('organic_os', 'N/A'),
                 owned_campaign=snippets.get('owned_campaign', 'N/A'),
                 paid_partner=snippets.get('paid_partner', 'N/A')
             )
-        elif slide_num == 3:
-            template = """1. [Provide key insight about installs breakout, focusing on OS if relevant for organic].
-2. [Add key insight 2]
-3. [Add key insight 3]"""
-            sub_topic_focus = "Installs Breakout details, particularly the Operating System driving organic performance if applicable."
-            context_extraction_instruction = "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the primary Operating System (OS) driving organic installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Organic OS: [Detected OS Name or N/A]'."
-        elif slide_num == 4:
-            template = """1. Overall: Owned installs showed [Change Description] at [Value].
-2. Key Driver Highlight: The primary driver for owned installs growth/decline was [Identify main driver/campaign]. [Optional: Add brief detail].
-3. [Add key insight 3]
-4. [Optional key insight 4]"""
-            sub_topic_focus = "Overall Owned Installs performance vs WoW, and identify the primary 2-3 drivers or campaigns influencing growth/decline."
-            context_extraction_instruction = "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the specific campaign name witnessing the highest growth for owned installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Owned Campaign: [Campaign Name or N/A]'."
-        elif slide_num == 5:
-            template = """1. Overall: Total paid installs showed [Change Description] at [Value].
-2. Primary Driver: The primary driver for paid spend/installs was [Identify main driver/partner/campaign], driven by [Specific reason if available].
-3. [Add key insight 3]
-4. [Optional key insight 4]"""
-            sub_topic_focus = "Overall Paid Installs performance vs WoW, and identify the primary driver (e.g., Google) and any reason for change (e.g., spend increase)."
-            context_extraction_instruction = "\nVERY IMPORTANT: On a new line *after* the Summary Phrase, identify the primary media partner associated with paid installs based *only* on the provided data for this slide. Format it EXACTLY like this: 'Context Snippet for Slide 2 - Paid Partner: [Partner Name or N/A]'."
-        elif slide_num == 6:
-             template = """1. Sessions/Cost: [Value] sessions at [Cost/Session Value] $/Session and CPA of [CPA Value].
-2. Re-engagement: [Value] users re-engaged ([Value]% of WAU).
-3. [Add key insight 3]
-4. [Optional key insight 4]"""
-             sub_topic_focus = "Sessions, cost per session, CPA, and re-engagement rate."
-        elif slide_num == 8: # Slide 8 is now standard
-            template = """1. Segment Growth: Reactivated users showed [Change Description], New users [Change Description], Current users [Change Description] YoY(compare the current reporting week with last year's same week+1, eg: 202506 vs 2020407; also display week number as last 2 digits instead of using 'K'; eg: for 202506, display just Week 06. Try to avoid commas, semicolons, fullstops and give a complete sentence).
-2. [Add key insight 2 about segments]
-3. [Add key insight 3 about segments]"""
-            sub_topic_focus = "Segment-wise user growth (Reactivated, New, Current) compared YoY."
-        # --- Slides 7 and 10 are handled chart-by-chart ---
-        elif slide_num in [1, 9, 11]: # Generic for others
-             print(f"  Using generic template for Slide {slide_num}.")
-             template = """1. [Insight 1]
-2. [Insight 2]
-3. [Insight 3]
-4. [Optional Insight 4]"""
-             sub_topic_focus = "General summary of key data points."
-        else:
-            print(f"  Warning: No specific template logic defined for Slide {slide_num}. Skipping prompt generation.")
-            return None
 
         # Format context data for the whole slide
         context_data_str = format_context_data(slide_num, slide_data) # Assumed helper function
         output_requirements = output_requirements.format(context_extraction_instruction=context_extraction_instruction)
 
     # --- Construct the Final Prompt ---
-    prompt = f"""{base_instructions}
+    # Collect sections in a list and join once; += on a prompt this size
+    # re-copies the whole buffer per append
+    # Static, byte-identical fragments lead the prompt so consecutive calls
+    # share the longest possible prefix for the provider's prompt cache;
+    # slide-specific context follows
+    parts = [f"""{base_instructions}
+{output_requirements}
 
 **Analysis Context & Focus:**
 - Target Slide: {slide_num} ({slide_data.get('title', 'N/A') if not chart_focus else 'Chart Focus'})
 - Key Focus Areas: {sub_topic_focus}
 {extra_instructions}
-{output_requirements}
-"""
+"""]
     if not chart_focus:
-        prompt += f"""
+        parts.append(f"""
 **Template Structure Guide (Follow Strictly for Key Highlights):**
-{template}"""
+{template}""")
 
-    prompt += f"""
+    parts.append(f"""
 **Provided Data Context:**
 {context_data_str}
 
 {final_request}
-"""
+""")
     # Add start for LLM for numbered lists if template starts that way
     if template.strip().startswith('1.'):
-        prompt += "\n1. "
+        parts.append("\n1. ")
+
+    log.debug("  Prompt built for Slide %s%s", slide_num, f" (Chart Focus: {chart_focus.get('title', chart_focus.get('name'))})" if chart_focus else "")
+    return "".join(parts)
+
+def build_batch_chart_prompt(slide_num, charts):
+    """
+    Builds ONE prompt covering every chart on a slide.
 
-    print(f"  Prompt built for Slide {slide_num}" + (f" (Chart Focus: {chart_focus.get('title', chart_focus.get('name'))})" if chart_focus else ""))
-    return prompt
+    The shared instruction block is sent once and each chart's data goes into
+    a labeled CHART_i section; the model answers with a JSON object keyed by
+    those labels, which parse_llm_response(is_batch=True) maps back to the
+    chart order. Saves one API round-trip (and one copy of the instructions)
+    per additional chart.
+
+    Args:
+        slide_num (int): The slide number being processed.
+        charts (list): List of chart_focus-style dicts ('name', 'title', 'data').
+
+    Returns:
+        str: The constructed prompt string, or None if charts is empty.
+    """
+    if not charts:
+        return None
+    parts = [f"""You are an expert analyst generating insights for the charts on presentation slide {slide_num}.
+Analyze ONLY the provided data context for each chart below. Starting from the latest week, just analyze the previous 4 weeks. Also display week number as last 2 digits instead of using 'K'; eg: for 202506, display just Week 06. Try to avoid commas, semicolons, fullstops and give a complete sentence
+For EACH chart, generate 1-2 concise, readable numbered bullet points (e.g., '1.', '2.') summarizing the key findings from ONLY that chart. Ensure a line break between points.
+
+**Output Requirements:**
+1. Respond with ONLY a single JSON object whose keys are the chart labels below (e.g. "CHART_1") and whose values are that chart's numbered bullet points as one string.
+2. Use professional, readable full sentences, not just phrases.
+3. **CRITICAL:** Ensure the values do NOT contain any square brackets `[` or `]`. Do not include any heading like "Key Highlights:".
+"""]
+    for idx, chart in enumerate(charts, start=1):
+        chart_title = chart.get('title') or chart.get('name') or f"Chart {idx}"
+        parts.append(f"\nCHART_{idx} ('{chart_title}'):\n")
+        parts.append(format_as_markdown_table(chart.get('data', [])))
+    parts.append("\n**Generate the JSON object now:**")
+    log.debug("  Batch chart prompt built for Slide %s (%s charts)", slide_num, len(charts))
+    return "".join(parts)
 
 # ==============================================================================
 # UPDATED parse_llm_response FUNCTION (No changes needed for these requests)
 # ==============================================================================
 
-def parse_llm_response(slide_num, response_text, is_chart_specific=False):
+# Precompiled parse_llm_response patterns. The re module caches compiles, but
+# its cache is LRU-bounded and every call still hashes the pattern string;
+# compiling once at import removes that from the per-response path.
+_IMD = re.IGNORECASE | re.MULTILINE | re.DOTALL
+_CONTEXT_PATTERNS = {
+    3: re.compile(r"Context Snippet for Slide 2 - Organic OS:\s*(.*)", _IMD),
+    4: re.compile(r"Context Snippet for Slide 2 - Owned Campaign:\s*(.*)", _IMD),
+    5: re.compile(r"Context Snippet for Slide 2 - Paid Partner:\s*(.*)", _IMD),
+}
+_SUMMARY_RE = re.compile(r"Summary Phrase:\s*(.*)", _IMD)
+_PERCENT_RE = re.compile(r'(([+-]?\d+(?:\.\d+)?)(\s*%\s*(?:WoW)?\b))', re.IGNORECASE)
+_BATCH_FENCE_RE = re.compile(r'^```text\s*|^```(?:json)?\s*|\s*```$', re.IGNORECASE)
+
+# Fused single-pass cleanup: one alternation with named alternatives and a
+# dispatch table, so the whole codefence/echo/heading/bracket/blank-line
+# scrub is a single scan of the insight instead of a pass per pattern
+_CLEANUP_RE = re.compile(
+    r"(?P<fence>^```text[ \t]*\n?|\s*```$)"
+    r"|(?P<echo>^Provide a brief summary of.*\.\s*)"
+    r"|(?P<heading>^\s*(?:\*\*?)?(?:Key Highlights|[\w\s]+ Insight|[\w\s]+ Performance):?(?:\*\*?)?\s*)"
+    r"|(?P<bracket>\[[^\]]*\])"
+    r"|(?P<blanks>\n{2,})",
+    re.IGNORECASE | re.MULTILINE,
+)
+_CLEANUP_REPLACEMENTS = {"fence": "", "echo": "", "heading": "", "bracket": "N/A", "blanks": "\n"}
+
+def _cleanup_dispatch(match):
+    """ Returns the replacement for whichever _CLEANUP_RE alternative matched. """
+    return _CLEANUP_REPLACEMENTS[match.lastgroup]
+
+def parse_llm_response(slide_num, response_text, is_chart_specific=False, is_batch=False):
     """
     Parses the LLM response. If not chart_specific, separates Key Highlights,
     Summary Phrase, and context snippet. Applies formatting rules.
@@ -643,66 +1630,68 @@ def parse_llm_response(slide_num, response_text, is_chart_specific=False):
         slide_num (int): The slide number the response is for.
         response_text (str): The raw text output from the LLM.
         is_chart_specific (bool): Flag indicating if the prompt was for a single chart.
+        is_batch (bool): Flag indicating the prompt came from build_batch_chart_prompt;
+                         the response is a JSON object keyed by CHART_i labels.
 
     Returns:
         dict: Contains 'main_insight' (str), and optionally 'summary_phrase', 'context_snippet'.
+              In batch mode, contains 'batch_insights' ({chart label: insight text}).
     """
     if not response_text:
+        if is_batch: return {'batch_insights': {}}
         if is_chart_specific: return {'main_insight': "[Error: No response from LLM]"}
         else: return {'main_insight': "[Error: No response from LLM]", 'summary_phrase': None, 'context_snippet': None}
 
+    # --- Batch chart responses: decode JSON, clean each chart's text ---
+    if is_batch:
+        cleaned = response_text.strip()
+        if '```' in cleaned:
+            cleaned = _BATCH_FENCE_RE.sub('', cleaned)
+        try:
+            batch = json.loads(cleaned)
+        except json.JSONDecodeError as e:
+            log.warning("Could not parse batch chart JSON for slide %s: %s", slide_num, e)
+            return {'batch_insights': {}}
+        return {'batch_insights': {
+            key: parse_llm_response(slide_num, text, is_chart_specific=True)['main_insight']
+            for key, text in batch.items() if isinstance(text, str)
+        }}
+
     main_insight = response_text
     summary_phrase = None
     context_snippet = None
 
     # --- Extract context snippet first (only if NOT chart-specific) ---
     if not is_chart_specific and slide_num in [3, 4, 5]:
-        patterns = {
-            3: r"Context Snippet for Slide 2 - Organic OS:\s*(.*)",
-            4: r"Context Snippet for Slide 2 - Owned Campaign:\s*(.*)",
-            5: r"Context Snippet for Slide 2 - Paid Partner:\s*(.*)"
-        }
-        pattern = patterns.get(slide_num)
+        pattern = _CONTEXT_PATTERNS.get(slide_num)
         if pattern:
-            match = re.search(pattern, main_insight, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+            match = pattern.search(main_insight)
             if match:
-                context_snippet = match.group(1).strip(); main_insight = re.sub(pattern, '', main_insight, flags=re.IGNORECASE | re.MULTILINE | re.DOTALL).strip()
-                print(f"    Successfully parsed context snippet for Slide {slide_num}: '{context_snippet}'")
-            else: print(f"    Warning: Could not parse context snippet for Slide {slide_num}. Check LLM output format.")
+                context_snippet = match.group(1).strip(); main_insight = pattern.sub('', main_insight).strip()
+                log.debug("    Successfully parsed context snippet for Slide %s: %r", slide_num, context_snippet)
+            else: log.warning("Could not parse context snippet for Slide %s. Check LLM output format.", slide_num)
 
     # --- Extract Summary Phrase (only if NOT chart-specific) ---
     if not is_chart_specific:
-        summary_pattern = r"Summary Phrase:\s*(.*)"
-        summary_match = re.search(summary_pattern, main_insight, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+        summary_match = _SUMMARY_RE.search(main_insight)
         if summary_match:
-            summary_phrase = summary_match.group(1).strip(); main_insight = re.sub(summary_pattern, '', main_insight, flags=re.IGNORECASE | re.MULTILINE | re.DOTALL).strip()
-            print(f"    Successfully parsed summary phrase: '{summary_phrase}'")
-        else: print(f"    Warning: Could not parse 'Summary Phrase:' from LLM response for slide {slide_num}.")
-
-    # --- Clean up main insight ---
-    main_insight = re.sub(r'^```text\s*', '', main_insight, flags=re.IGNORECASE).strip()
-    main_insight = re.sub(r'\s*```$', '', main_insight, flags=re.IGNORECASE).strip()
-    main_insight = re.sub(r'^Provide a brief summary of.*\.\s*', '', main_insight, flags=re.IGNORECASE).strip()
-    main_insight = re.sub(r'^\s*(\*\*?)?Key Highlights:?(\*\*?)?\s*', '', main_insight, flags=re.IGNORECASE | re.MULTILINE).strip()
-    main_insight = re.sub(r'^\s*(\*\*?)?[\w\s]+ Insight:?(\*\*?)?\s*', '', main_insight, flags=re.IGNORECASE | re.MULTILINE).strip()
-    main_insight = re.sub(r'^\s*(\*\*?)?[\w\s]+ Performance:?(\*\*?)?\s*', '', main_insight, flags=re.IGNORECASE | re.MULTILINE).strip()
-    main_insight = re.sub(r'\[[^\]]*\]', 'N/A', main_insight).strip()
+            summary_phrase = summary_match.group(1).strip(); main_insight = _SUMMARY_RE.sub('', main_insight).strip()
+            log.debug("    Successfully parsed summary phrase: %r", summary_phrase)
+        else: log.warning("Could not parse 'Summary Phrase:' from LLM response for slide %s.", slide_num)
+
+    # --- Clean up main insight (codefences, prompt echo, headings, brackets,
+    # blank lines) in a single fused pass ---
+    main_insight = _CLEANUP_RE.sub(_cleanup_dispatch, main_insight).strip()
 
     # --- Apply Formatting Rules to main_insight ---
-    percent_pattern = r'(([+-]?\d+(?:\.\d+)?)(\s*%\s*(?:WoW)?\b))' # Original pattern to find percentages
     try:
-        # Apply the formatting function which now returns phrases for >120%
-        main_insight = re.sub(percent_pattern, format_percentage, main_insight, flags=re.IGNORECASE)
-        print("    Applied percentage formatting.")
-    except Exception as e: print(f"    Warning: Error during percentage formatting: {e}")
-
-    def replace_numbers(text):
-        processed_text = text; num_pattern = r'(?<![KM])\b(\d{1,3}(?:,\d{3})+|\d{4,})\b(?![KM])'
-        processed_text = re.sub(num_pattern, lambda m: format_large_number(m.group(1)), processed_text); return processed_text
-    try: main_insight = replace_numbers(main_insight); print("    Applied number abbreviation formatting.")
-    except Exception as e: print(f"    Warning: Error during number abbreviation formatting: {e}")
+        # Replaces out-of-bounds percentages (>120%) with qualitative phrases
+        main_insight = _format_percentages(main_insight)
+        log.debug("    Applied percentage formatting.")
+    except Exception as e: log.warning("Error during percentage formatting: %s", e)
 
-    main_insight = re.sub(r'\n{2,}', '\n', main_insight).strip()
+    try: main_insight = _abbreviate_numbers(main_insight); log.debug("    Applied number abbreviation formatting.")
+    except Exception as e: log.warning("Error during number abbreviation formatting: %s", e)
 
     # Return appropriate dictionary structure
     if is_chart_specific:
@@ -711,10 +1700,170 @@ def parse_llm_response(slide_num, response_text, is_chart_specific=False):
         return {'main_insight': main_insight, 'summary_phrase': summary_phrase, 'context_snippet': context_snippet}
 
 
+_SUMMARY_SENTINEL = "Summary Phrase:"
+
+def parse_llm_stream(slide_num, deltas, is_chart_specific=False):
+    """
+    Parses a streaming LLM response incrementally.
+
+    The 'Summary Phrase:' sentinel partitions the output: as soon as it
+    appears in the stream the main insight is cleaned and formatted, so the
+    regex/number work overlaps with the model still decoding the summary
+    (and any context snippet). A failure while consuming the stream (e.g. a
+    dropped connection mid-response) degrades to the same error-text result
+    the blocking path produces instead of propagating to the caller.
+    Returns the same dict as parse_llm_response.
+
+    Args:
+        slide_num (int): The slide number the response is for.
+        deltas: Iterable of text chunks from function_4_call_llm(stream=True),
+                or None if the call failed.
+        is_chart_specific (bool): Same meaning as in parse_llm_response.
+
+    Returns:
+        dict: Same structure as parse_llm_response.
+    """
+    if deltas is None:
+        return parse_llm_response(slide_num, None, is_chart_specific)
+
+    seen = ""
+    head_result = None
+    try:
+        for delta in deltas:
+            seen += delta
+            if head_result is None and not is_chart_specific:
+                idx = seen.find(_SUMMARY_SENTINEL)
+                if idx != -1:
+                    # Head is complete: clean/format it while the tail streams
+                    # in. Parsed as chart-specific because the head deliberately
+                    # excludes the tail — running the summary/context extraction
+                    # on it would log a false "could not parse" warning per slide
+                    head_result = parse_llm_response(slide_num, seen[:idx], is_chart_specific=True)
+    except Exception as e:
+        # Mirror the blocking path, where function_4_call_llm converts API
+        # errors to None: a mid-stream failure becomes the error-text result
+        # rather than crashing the whole insights run
+        log.error("LLM stream for slide %s failed mid-response: %s", slide_num, e)
+        return parse_llm_response(slide_num, None, is_chart_specific)
+
+    if head_result is None:
+        return parse_llm_response(slide_num, seen, is_chart_specific)
+
+    # Parse the tail for the summary phrase / context snippet and keep the
+    # already-formatted head
+    tail_result = parse_llm_response(slide_num, seen[seen.find(_SUMMARY_SENTINEL):], is_chart_specific)
+    return {
+        'main_insight': head_result['main_insight'],
+        'summary_phrase': tail_result.get('summary_phrase'),
+        'context_snippet': tail_result.get('context_snippet'),
+    }
+
 # ==============================================================================
 # UPDATED FUNCTION TO PASTE ALL TEXT TYPES (Numbered Lists & Spacing)
 # ==============================================================================
 
+# --- Paste formatting constants: plain point sizes and a hex color; the
+# Pt/RGBColor wrapper objects are built once, lazily, by _paste_fonts so a
+# prompt-only or fully cached run never pays the pptx import at startup ---
+HEADING_TEXT = "Key Highlights"
+HIGHLIGHTS_FONT_NAME = "Poppins"; HIGHLIGHTS_FONT_FALLBACK = "Calibri"
+HEADING_FONT_SIZE_PT = 8; INSIGHT_FONT_SIZE_PT = 7
+
+SUMMARY_FONT_NAME = "Poppins"; SUMMARY_FONT_FALLBACK = "Calibri"
+SUMMARY_FONT_SIZE_PT = 9 # Specific size
+CHART_SPECIFIC_FONT_NAME = "Poppins"; CHART_SPECIFIC_FONT_FALLBACK = "Calibri"
+CHART_SPECIFIC_FONT_SIZE_PT = 7 # Same as insight text
+
+FONT_COLOR_HEX = "001E60" # Shared by headings, insights and summaries
+
+_SPACE_BEFORE_PT = 0
+_SPACE_AFTER_PT = 3 # Small space after each bullet point paragraph
+
+@lru_cache(maxsize=1)
+def _paste_fonts():
+    """
+    Builds the immutable Pt/RGBColor style objects on first paste.
+
+    pptx.util and pptx.dml import here rather than at module top, so runs
+    that never reach the paste step skip the pptx import cost entirely.
+
+    Returns:
+        dict: Style objects keyed by 'heading_size', 'insight_size',
+              'summary_size', 'chart_size' and 'color'.
+    """
+    from pptx.util import Pt
+    from pptx.dml.color import RGBColor
+    return {
+        'heading_size': Pt(HEADING_FONT_SIZE_PT),
+        'insight_size': Pt(INSIGHT_FONT_SIZE_PT),
+        'summary_size': Pt(SUMMARY_FONT_SIZE_PT),
+        'chart_size': Pt(CHART_SPECIFIC_FONT_SIZE_PT),
+        'color': RGBColor.from_string(FONT_COLOR_HEX),
+    }
+
+# Leading bullet/number prefixes emitted by the LLM (e.g. '1. ', '- ', '* ')
+_LEADING_BULLET_RE = re.compile(r'^\s*[\*\-\d]+\.?\s*')
+
+def _set_default_run_style(txBody, font_name, font_size_pt, rgb_hex):
+    """
+    Writes the shared run style once into the shape's <a:lstStyle>.
+
+    Runs without their own <a:rPr> inherit from the list style, so the
+    insight paragraphs can carry bare runs instead of repeating the same
+    size/color/typeface blob on every line.
+
+    Args:
+        txBody: The text frame's txBody element.
+        font_name (str): Latin typeface name.
+        font_size_pt (int): Font size in points.
+        rgb_hex (str): Font color as a 6-digit hex string (e.g. "001E60").
+    """
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls, qn
+
+    sz = int(font_size_pt * 100)          # a:defRPr sz is hundredths of a point
+    lst_style = parse_xml(
+        f'<a:lstStyle {nsdecls("a")}><a:lvl1pPr>'
+        f'<a:defRPr lang="en-US" sz="{sz}" b="0" dirty="0">'
+        f'<a:solidFill><a:srgbClr val="{rgb_hex}"/></a:solidFill>'
+        f'<a:latin typeface="{font_name}"/></a:defRPr>'
+        f'</a:lvl1pPr></a:lstStyle>'
+    )
+    existing = txBody.find(qn('a:lstStyle'))
+    if existing is not None:
+        txBody.remove(existing)
+    txBody.insert(1, lst_style)  # schema order: bodyPr, lstStyle, then a:p
+
+def _build_paragraphs_xml(lines, space_after_pt):
+    """
+    Builds ready-to-append <a:p> elements for a list of insight lines.
+
+    Serializes every paragraph (spacing plus a bare run) into one XML string
+    and parses it once, instead of mutating the tree through a
+    add_paragraph/add_run/font-setter call per line. Run styling comes from
+    the list style written by _set_default_run_style.
+
+    Args:
+        lines (list): Display-ready text lines, one paragraph each.
+        space_after_pt (int): Paragraph space-after in points.
+
+    Returns:
+        list: lxml elements to append to a text frame's txBody.
+    """
+    from pptx.oxml import parse_xml
+    from pptx.oxml.ns import nsdecls
+
+    spc = int(space_after_pt * 100)       # a:spcPts val is hundredths of a point
+    paragraphs = "".join(
+        f'<a:p>'
+        f'<a:pPr><a:spcBef><a:spcPts val="0"/></a:spcBef>'
+        f'<a:spcAft><a:spcPts val="{spc}"/></a:spcAft></a:pPr>'
+        f'<a:r><a:t>{_xml_escape(line)}</a:t></a:r></a:p>'
+        for line in lines
+    )
+    root = parse_xml(f'<root {nsdecls("a")}>{paragraphs}</root>')
+    return list(root)
+
 def paste_all_text_to_ppt(prs, all_text_map):
     """
     Pastes various types of text (Key Highlights, Summary Phrase, Chart Specific)
@@ -727,126 +1876,140 @@ def paste_all_text_to_ppt(prs, all_text_map):
                              where keys are shape names and values are dicts
                              {'text': insight_text, 'type': 'key_highlight' | 'summary_phrase' | 'chart_specific'}.
     """
-    print("\n--- Pasting All Generated Text into PowerPoint ---")
+    log.debug("--- Pasting All Generated Text into PowerPoint ---")
+    styles = _paste_fonts()
     pasted_count = 0
     failed_pastes = []
 
-    # --- Define Formatting ---
-    HEADING_TEXT = "Key Highlights"
-    HIGHLIGHTS_FONT_NAME = "Poppins"; HIGHLIGHTS_FONT_FALLBACK = "Calibri"
-    HEADING_FONT_SIZE_PT = 8; INSIGHT_FONT_SIZE_PT = 7
-    HIGHLIGHTS_FONT_COLOR_RGB = RGBColor.from_string("001E60")
-
-    SUMMARY_FONT_NAME = "Poppins"; SUMMARY_FONT_FALLBACK = "Calibri"
-    SUMMARY_FONT_SIZE_PT = 9 # Specific size
-    SUMMARY_FONT_COLOR_RGB = RGBColor.from_string("001E60")
-
-    CHART_SPECIFIC_FONT_NAME = "Poppins"; CHART_SPECIFIC_FONT_FALLBACK = "Calibri"
-    CHART_SPECIFIC_FONT_SIZE_PT = 7 # Same as insight text
-    CHART_SPECIFIC_FONT_COLOR_RGB = RGBColor.from_string("001E60")
-
     # Sort slide numbers to process in order
     for slide_num in sorted(all_text_map.keys()):
         shape_texts = all_text_map[slide_num]
         if not isinstance(shape_texts, dict): continue
 
         if not (1 <= slide_num <= len(prs.slides)):
-            print(f"  Skipping Slide {slide_num}: Slide number out of range.")
+            log.warning("Skipping Slide %s: Slide number out of range.", slide_num)
             failed_pastes.append(f"Slide {slide_num} (Out of Range)")
             continue
 
         slide = prs.slides[slide_num - 1]
-        print(f"  Processing Slide {slide_num} for pasting...")
+        log.debug("  Processing Slide %s for pasting...", slide_num)
+
+        # Index shapes by stripped name once per slide; probing the dict is
+        # O(1) per target instead of re-walking (and re-stripping) all shapes
+        shape_index = {s.name.strip(): s for s in slide.shapes if hasattr(s, 'name')}
 
         for shape_name, text_info in shape_texts.items():
             text_to_paste = text_info.get('text')
             paste_type = text_info.get('type')
 
             if not text_to_paste or text_to_paste.startswith("[Error"):
-                print(f"    Skipping paste to '{shape_name}': Text missing or error.")
+                log.debug("    Skipping paste to %r: Text missing or error.", shape_name)
                 failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (Text Error)")
                 continue
 
             shape_found = False
-            for shape in slide.shapes:
-                if hasattr(shape, 'name') and shape.name.strip() == shape_name.strip():
-                    if shape.has_text_frame:
-                        print(f"    Found shape '{shape_name}'. Pasting text (Type: {paste_type})...")
-                        try:
-                            tf = shape.text_frame; tf.clear()
-                            # Ensure first paragraph exists for adding runs
-                            if not tf.paragraphs: tf.add_paragraph()
-                            p = tf.paragraphs[0]
-                            for r in p.runs: r._r.getparent().remove(r._r) # Clear runs from first para
-
-                            # Apply formatting based on type
-                            if paste_type == 'key_highlight' or paste_type == 'chart_specific':
-                                # Add Heading to first paragraph
-                                run_heading = p.add_run()
-                                run_heading.text = HEADING_TEXT; run_heading.font.name = HIGHLIGHTS_FONT_NAME
-                                run_heading.font.size = Pt(HEADING_FONT_SIZE_PT); run_heading.font.color.rgb = HIGHLIGHTS_FONT_COLOR_RGB
-                                run_heading.font.bold = True
-
-                                # Add Insight Text lines in subsequent paragraphs
-                                insight_lines = text_to_paste.split('\n')
-                                item_number = 1 # Start numbering
-                                for line in insight_lines:
-                                    line = line.strip();
-                                    if not line: continue # Skip empty lines
-
-                                    p_insight = tf.add_paragraph() # New paragraph for each line/bullet
-                                    # Remove potential leading bullet/number from LLM output
-                                    text_for_run = re.sub(r'^\s*[\*\-\d]+\.?\s*', '', line).strip()
-
-                                    # Add run with the number and the text
-                                    run_insight = p_insight.add_run()
-                                    run_insight.text = f"{item_number}. {text_for_run}" # Add number prefix
-                                    item_number += 1
-
-                                    # Apply formatting
-                                    font_name = HIGHLIGHTS_FONT_NAME if paste_type == 'key_highlight' else CHART_SPECIFIC_FONT_NAME
-                                    font_size = INSIGHT_FONT_SIZE_PT if paste_type == 'key_highlight' else CHART_SPECIFIC_FONT_SIZE_PT
-                                    font_color = HIGHLIGHTS_FONT_COLOR_RGB if paste_type == 'key_highlight' else CHART_SPECIFIC_FONT_COLOR_RGB
-                                    run_insight.font.name = font_name; run_insight.font.size = Pt(font_size)
-                                    run_insight.font.color.rgb = font_color; run_insight.font.bold = False
-                                    # Ensure spacing between paragraphs (adjust Pt value if needed)
-                                    p_insight.space_before = Pt(0)
-                                    p_insight.space_after = Pt(3) # Add small space after each bullet point paragraph
-
-                            elif paste_type == 'summary_phrase':
-                                run = p.add_run() # Use the first paragraph
-                                run.text = text_to_paste
-                                run.font.name = SUMMARY_FONT_NAME
-                                run.font.size = Pt(SUMMARY_FONT_SIZE_PT)
-                                run.font.color.rgb = SUMMARY_FONT_COLOR_RGB
-                                run.font.bold = False
-
-                            else: # Default paste if type is unknown
-                                 run = p.add_run(); run.text = text_to_paste
-
-                            shape_found = True; pasted_count += 1
-                            print(f"    Successfully pasted text to shape '{shape_name}'.")
-                            break # Move to next shape_name in map
-                        except Exception as e:
-                            print(f"    ERROR pasting text into shape '{shape_name}': {e}")
-                            failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (Pasting Error)")
-                            shape_found = True; break # Stop trying for this shape
-                    else:
-                        print(f"    Warning: Found shape '{shape_name}', but it has no text frame.")
-                        failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (No Text Frame)")
-                        shape_found = True; break # Stop trying for this shape
+            shape = shape_index.get(shape_name.strip())
+            if shape is not None:
+                if shape.has_text_frame:
+                    log.debug("    Found shape %r. Pasting text (Type: %s)...", shape_name, paste_type)
+                    try:
+                        tf = shape.text_frame; tf.clear()
+                        # Ensure first paragraph exists for adding runs
+                        if not tf.paragraphs: tf.add_paragraph()
+                        p = tf.paragraphs[0]
+                        for r in p.runs: r._r.getparent().remove(r._r) # Clear runs from first para
+
+                        # Apply formatting based on type
+                        if paste_type == 'key_highlight' or paste_type == 'chart_specific':
+                            # Add Heading to first paragraph
+                            run_heading = p.add_run()
+                            run_heading.text = HEADING_TEXT; run_heading.font.name = HIGHLIGHTS_FONT_NAME
+                            run_heading.font.size = styles['heading_size']; run_heading.font.color.rgb = styles['color']
+                            run_heading.font.bold = True
+
+                            # Collect numbered insight lines, then append all
+                            # <a:p> nodes in one build instead of ~6 lxml
+                            # mutations per line
+                            numbered_lines = []
+                            for line in text_to_paste.split('\n'):
+                                if not line.strip(): continue # Skip empty lines
+                                # Remove potential leading bullet/number from LLM output
+                                text_for_run = _LEADING_BULLET_RE.sub('', line.strip())
+                                numbered_lines.append("".join((str(len(numbered_lines) + 1), ". ", text_for_run))) # Add number prefix
+
+                            font_name = HIGHLIGHTS_FONT_NAME if paste_type == 'key_highlight' else CHART_SPECIFIC_FONT_NAME
+                            font_size_pt = INSIGHT_FONT_SIZE_PT if paste_type == 'key_highlight' else CHART_SPECIFIC_FONT_SIZE_PT
+                            txBody = tf._txBody
+                            _set_default_run_style(txBody, font_name, font_size_pt, FONT_COLOR_HEX)
+                            for p_el in _build_paragraphs_xml(numbered_lines, _SPACE_AFTER_PT):
+                                txBody.append(p_el)
+
+                        elif paste_type == 'summary_phrase':
+                            run = p.add_run() # Use the first paragraph
+                            run.text = text_to_paste
+                            run.font.name = SUMMARY_FONT_NAME
+                            run.font.size = styles['summary_size']
+                            run.font.color.rgb = styles['color']
+                            run.font.bold = False
+
+                        else: # Default paste if type is unknown
+                             run = p.add_run(); run.text = text_to_paste
+
+                        shape_found = True; pasted_count += 1
+                        log.debug("    Successfully pasted text to shape %r.", shape_name)
+                    except Exception as e:
+                        log.error("Error pasting text into shape %r: %s", shape_name, e)
+                        failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (Pasting Error)")
+                        shape_found = True # Stop trying for this shape
+                else:
+                    log.warning("Found shape %r, but it has no text frame.", shape_name)
+                    failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (No Text Frame)")
+                    shape_found = True # Stop trying for this shape
 
             if not shape_found:
-                print(f"    Warning: Target shape '{shape_name}' not found on slide {slide_num}.")
+                log.warning("Target shape %r not found on slide %s.", shape_name, slide_num)
                 failed_pastes.append(f"Slide {slide_num} / Shape '{shape_name}' (Not Found)")
 
-    print(f"--- Finished Pasting All Text: Pasted {pasted_count} text blocks. Failures/Skips: {failed_pastes} ---")
+    print(f"--- Finished Pasting All Text: Pasted {pasted_count} text blocks, {len(failed_pastes)} failures/skips. ---")
+    if failed_pastes:
+        log.warning("Paste failures/skips: %s", "; ".join(failed_pastes))
+
 
+def _save_presentation_patched(presentation, src_path, out_path, modified_slide_nums):
+    """
+    Writes the output deck by copying the source .pptx and patching only the
+    slide parts that were edited.
+
+    python-pptx's save() re-serializes every part in the package; pasting
+    insights touches a handful of slide XMLs, so every other zip entry is
+    copied through as raw bytes with no XML parse or re-serialization.
+
+    Args:
+        presentation: The (mutated) python-pptx Presentation object.
+        src_path (str): Path of the originally loaded .pptx file.
+        out_path (str): Destination path for the patched copy.
+        modified_slide_nums (iterable): 1-based slide numbers whose XML changed.
+    """
+    replacements = {}
+    for slide_num in modified_slide_nums:
+        if 1 <= slide_num <= len(presentation.slides):
+            part = presentation.slides[slide_num - 1].part
+            replacements[str(part.partname).lstrip('/')] = part.blob
+    with zipfile.ZipFile(src_path) as zin, zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            data = replacements.get(item.filename)
+            if data is None:
+                data = zin.read(item.filename)
+            zout.writestr(item, data)
 
 # ==============================================================================
 # MAIN LOGIC FUNCTION (UPDATED to store prompts)
 # ==============================================================================
 
+def _abs(p, base):
+    """ Resolves p against base unless it is already absolute. """
+    return p if os.path.isabs(p) else os.path.normpath(os.path.join(base, p))
+
 def generate_and_paste_insights(config_file_path):
     """
     Main function to generate insights, handle chart-specific cases,
@@ -857,23 +2020,25 @@ def generate_and_paste_insights(config_file_path):
     """
     print(f"Starting Insight Generation Process using config: {config_file_path}")
 
-    # --- Initialize OpenAI Client ONCE ---
-    llm_client = None
-    try:
-        load_dotenv()
-        llm_client = AzureOpenAI(api_key=os.getenv("AZURE_OPENAI_API_KEY"), azure_endpoint=os.getenv("AZURE_OPENAI_API_ENDOINT"), api_version="2024-02-15-preview")
-        llm_client.models.list(); print("OpenAI client initialized successfully.")
-    except Exception as e: print(f"FATAL ERROR: Could not initialize OpenAI client. Error: {e}"); return
-
     # 1. Load Unified Config
     mapping_data = {}
     insight_placeholders_map = {}
     summary_placeholders_map = {}
     llm_model_id = "gpt-4o"
     llm_temperature = 0.2
+    llm_mode = "async"  # "async" for interactive runs, "batch" for scheduled ones
     try:
         print(f"Attempting to load config from: {os.path.abspath(config_file_path)}")
-        with open(config_file_path, 'r') as f: mapping_data = json.load(f, strict=False)
+        if orjson is not None:
+            with open(config_file_path, 'rb') as f: raw_config = f.read()
+            try:
+                mapping_data = orjson.loads(raw_config)
+            except orjson.JSONDecodeError:
+                # orjson has no strict=False; fall back for configs carrying
+                # raw control characters inside strings
+                mapping_data = json.loads(raw_config.decode('utf-8'), strict=False)
+        else:
+            with open(config_file_path, 'r') as f: mapping_data = json.load(f, strict=False)
         print("--- Successfully loaded JSON data ---")
 
         # PPTX_FILE_PATH = mapping_data.get("ppt_path")
@@ -882,13 +2047,14 @@ def generate_and_paste_insights(config_file_path):
         PPTX_OUTPUT_PATH = mapping_data.get("ppt_insights_output_path")        
         llm_model_id = mapping_data.get("llm_model_id", llm_model_id)
         llm_temperature = mapping_data.get("llm_temperature", llm_temperature)
+        llm_mode = mapping_data.get("llm_mode", llm_mode)
 
         if not PPTX_FILE_PATH: raise ValueError("'ppt_path' not found in config.")
         if not PPTX_OUTPUT_PATH: raise ValueError("'ppt_output_path' not found in config.")
 
         config_dir = os.path.dirname(config_file_path)
-        if not os.path.isabs(PPTX_FILE_PATH): PPTX_FILE_PATH = os.path.join(config_dir, PPTX_FILE_PATH)
-        if not os.path.isabs(PPTX_OUTPUT_PATH): PPTX_OUTPUT_PATH = os.path.join(config_dir, PPTX_OUTPUT_PATH)
+        PPTX_FILE_PATH = _abs(PPTX_FILE_PATH, config_dir)
+        PPTX_OUTPUT_PATH = _abs(PPTX_OUTPUT_PATH, config_dir)
 
         print(f"Using PPTX input file: {PPTX_FILE_PATH}")
         print(f"Final PPT output will be saved to: {PPTX_OUTPUT_PATH}")
@@ -896,12 +2062,12 @@ def generate_and_paste_insights(config_file_path):
         print(f"Using LLM Temperature: {llm_temperature}")
 
         default_excel = mapping_data.get("excel_path")
-        if default_excel and not os.path.isabs(default_excel): mapping_data["excel_path"] = os.path.join(config_dir, default_excel)
+        if default_excel: mapping_data["excel_path"] = _abs(default_excel, config_dir)
 
         insight_placeholders_map = mapping_data.get("insight_placeholders", {})
         summary_placeholders_map = mapping_data.get("slide_summary_placeholders", {})
-        print(f"DEBUG: Loaded insight_placeholders_map: {insight_placeholders_map}")
-        print(f"DEBUG: Loaded slide_summary_placeholders_map: {summary_placeholders_map}")
+        log.debug("Loaded insight_placeholders_map: %s", insight_placeholders_map)
+        log.debug("Loaded slide_summary_placeholders_map: %s", summary_placeholders_map)
         if not insight_placeholders_map: print("Warning: 'insight_placeholders' key not found/empty. Key Highlights will not be pasted.")
         if not summary_placeholders_map: print("Warning: 'slide_summary_placeholders' key not found/empty. Summary Phrases will not be pasted.")
 
@@ -909,18 +2075,35 @@ def generate_and_paste_insights(config_file_path):
     except json.JSONDecodeError as e: print(f"FATAL ERROR: Invalid JSON syntax in '{config_file_path}'. Details: {e}"); return
     except Exception as e: print(f"FATAL ERROR: Error loading config JSON '{config_file_path}': {e}"); return
 
-    # 2. Load Presentation
+    # 2. Load Presentation on a background thread while the OpenAI client
+    # warms up; the PPTX unzip and the TLS/auth round-trip are independent
+    # I/O streams, so they overlap instead of running back to back
+    from pptx import Presentation # Deferred: only paid when a deck is actually opened
+    pptx_executor = ThreadPoolExecutor(max_workers=1)
+    presentation_future = pptx_executor.submit(Presentation, PPTX_FILE_PATH)
+
+    # --- Initialize OpenAI Client ONCE ---
+    llm_client = None
+    try:
+        load_dotenv()
+        llm_client = build_openai_client()
+        llm_client.models.list(); print("OpenAI client initialized successfully.")
+    except Exception as e: print(f"FATAL ERROR: Could not initialize OpenAI client. Error: {e}"); return
+
     presentation = None
     try:
-        presentation = Presentation(PPTX_FILE_PATH)
+        presentation = presentation_future.result()
         print(f"Opened presentation with {len(presentation.slides)} slides.")
     except Exception as e: print(f"FATAL ERROR: Error opening PPTX file '{PPTX_FILE_PATH}': {e}"); return
+    finally:
+        pptx_executor.shutdown(wait=False)
 
     # 3. Initialize Data Structures
     all_extracted_data = {}
     slide_2_context_snippets = {'organic_os': None, 'owned_campaign': None, 'paid_partner': None}
     all_insights_to_paste = {}
     all_prompts_generated = {} # <<< Dictionary to store prompts
+    deferred_prompts = {} # slide_num -> prompt, for slides with no cross-slide dependency
 
     # 4. Define Processing Order
     num_slides_in_ppt = len(presentation.slides)
@@ -930,19 +2113,29 @@ def generate_and_paste_insights(config_file_path):
                       + sorted([s for s in all_slide_nums if s not in [2, 3, 4, 5]])
     print(f"Processing slides in order: {slides_to_process}")
 
+    # Extraction (pptx XML walk + Excel reads) is CPU/disk-bound while the
+    # LLM calls are network-bound; two extractor threads keep later slides'
+    # data being prepared while the current slide's request is in flight
+    def _extract_slide(s):
+        data = {}
+        function_1_extract_pptx(s, presentation, data)
+        function_2_add_chart_data(s, mapping_data, data)
+        return data
+
+    extraction_pool = ThreadPoolExecutor(max_workers=2)
+    extraction_futures = {s: extraction_pool.submit(_extract_slide, s)
+                          for s in slides_to_process if 1 <= s <= num_slides_in_ppt}
+
     # 5. Main Processing Loop (Generate Insights)
     for slide_num in slides_to_process:
         if slide_num < 1 or slide_num > num_slides_in_ppt: continue
         print(f"\n===== Processing Slide {slide_num} =====")
 
-        # --- Extract Data Once ---
+        # --- Extract Data Once (joined from the background extractors) ---
         if slide_num not in all_extracted_data:
             print(f"  Extracting data for slide {slide_num}...")
-            current_slide_data = {}
             try:
-                function_1_extract_pptx(slide_num, presentation, current_slide_data)
-                function_2_add_chart_data(slide_num, mapping_data, current_slide_data)
-                all_extracted_data[slide_num] = current_slide_data.copy()
+                all_extracted_data[slide_num] = extraction_futures[slide_num].result()
                 print(f"  Data extraction complete for slide {slide_num}.")
             except Exception as e:
                  print(f"  ERROR extracting data for slide {slide_num}: {e}. Skipping insight generation.")
@@ -965,59 +2158,67 @@ def generate_and_paste_insights(config_file_path):
 
             charts_on_slide = slide_data_for_prompt.get('charts_excel_data', [])
             chart_identifiers_from_f1 = slide_data_for_prompt.get('chart_identifiers', [])
-            processed_chart_ids = set()
-
+            chart_entries = []  # chart_focus-style dicts for the batch prompt
+            chart_targets = {}  # "CHART_i" label -> (textbox_name, chart_title)
+            chart_first_lines = []  # first line per stored insight, for the slide-7 summary
+
+            # Charts pair with textboxes positionally: the old inner scan with
+            # match_condition=True always took the next unconsumed chart, so a
+            # plain advancing index replaces the O(keys x charts) rescan
+            next_chart_idx = 0
             for chart_id_key, textbox_name in chart_textbox_map.items():
                 print(f"    Processing pair: Chart Key='{chart_id_key}' -> Textbox='{textbox_name}'")
-                # Debug
-                # print(f"\nHi01\nand {charts_on_slide}")
-                chart_data_to_send = None; chart_title = chart_id_key; found_match = False
-                for i, chart_info in enumerate(charts_on_slide):
-                    # print("\nHi02\n")
+                chart_data_to_send = None; chart_title = chart_id_key
+                if next_chart_idx < len(charts_on_slide):
+                    i = next_chart_idx; next_chart_idx += 1
+                    chart_info = charts_on_slide[i]
                     chart_f1_info = chart_identifiers_from_f1[i] if i < len(chart_identifiers_from_f1) else {}
                     chart_name_f1 = chart_f1_info.get('name'); chart_title_f1 = chart_f1_info.get('title')
                     chart_excel_id = chart_info.get('identifier')
-                    # match_condition = (chart_excel_id == chart_id_key or chart_title_f1 == chart_id_key) # Adjust matching if needed
-                    match_condition = True
-                    # print(f"i is: {i}\n and pci is: {processed_chart_ids}\n")
-                    if match_condition and i not in processed_chart_ids:
-                        # print("\nhi\n")
-                        chart_data_to_send = {'name': chart_name_f1 or chart_excel_id, 'title': chart_title_f1 or chart_info.get('mapped_title', chart_id_key), 'data': chart_info.get('data')}
-                        chart_title = chart_data_to_send['title'] or chart_data_to_send['name']; print(f"      Found data for chart '{chart_title}'.")
-                        processed_chart_ids.add(i); found_match = True; break
-                if not found_match or not chart_data_to_send or not chart_data_to_send.get('data'):
+                    chart_data_to_send = {'name': chart_name_f1 or chart_excel_id, 'title': chart_title_f1 or chart_info.get('mapped_title', chart_id_key), 'data': chart_info.get('data')}
+                    chart_title = chart_data_to_send['title'] or chart_data_to_send['name']; print(f"      Found data for chart '{chart_title}'.")
+                if not chart_data_to_send or not chart_data_to_send.get('data'):
                     print(f"      Warning: Data for chart key '{chart_id_key}' not found or empty. Skipping LLM call.")
-                    all_insights_to_paste[slide_num][textbox_name] = {'text': "[Data not found for chart]", 'type': 'chart_specific'}; continue
+                    all_insights_to_paste[slide_num][textbox_name] = {'text': "[Data not found for chart]", 'type': 'chart_specific'}
+                    chart_first_lines.append("[Data not found for chart]"); continue
 
-                prompt = build_prompt_for_slide(slide_num, None, chart_focus=chart_data_to_send)
-                prompt_key = f"slide_{slide_num}_chart_{chart_data_to_send.get('name','unknown')}" # <<< Store prompt
-                all_prompts_generated[prompt_key] = prompt # <<< Store prompt
+                # Collect the chart into the batch; all charts on this slide
+                # share one prompt and one API round-trip
+                chart_entries.append(chart_data_to_send)
+                chart_targets[f"CHART_{len(chart_entries)}"] = (textbox_name, chart_title)
 
-                if not prompt:
-                    print(f"      Skipping LLM call for chart '{chart_title}' as no prompt was generated.")
-                    all_insights_to_paste[slide_num][textbox_name] = {'text': "[Prompt generation failed]", 'type': 'chart_specific'}; continue
+            if chart_entries:
+                prompt = build_batch_chart_prompt(slide_num, chart_entries)
+                prompt_key = f"slide_{slide_num}_charts_batch" # <<< Store prompt
+                all_prompts_generated[prompt_key] = prompt # <<< Store prompt
 
-                print(f"      Calling LLM for chart '{chart_title}'...")
-                raw_response_text = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature)
-                parsed_result = parse_llm_response(slide_num, raw_response_text, is_chart_specific=True)
-                chart_insight_text = parsed_result['main_insight']
-                all_insights_to_paste[slide_num][textbox_name] = {'text': chart_insight_text, 'type': 'chart_specific'}
-                print(f"      Stored insight for chart '{chart_title}' targeting textbox '{textbox_name}'.")
+                print(f"      Calling LLM once for {len(chart_entries)} charts...")
+                # The JSON answer grows with the chart count; under the
+                # single-response 300-token default it gets truncated,
+                # json.loads fails, and every chart falls through to the
+                # error text. Budget the single-chart allowance per chart
+                batch_max_tokens = 300 * len(chart_entries)
+                if llm_mode == "batch":
+                    # Scheduled runs push the chart prompt through the Batch API too
+                    raw_response_text = generate_all_insights_batch({prompt_key: prompt}, model_id=llm_model_id, temperature=llm_temperature, max_tokens_response=batch_max_tokens).get(prompt_key)
+                else:
+                    raw_response_text = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature, max_tokens_response=batch_max_tokens)
+                batch_insights = parse_llm_response(slide_num, raw_response_text, is_batch=True).get('batch_insights', {})
+                for chart_label, (textbox_name, chart_title) in chart_targets.items():
+                    chart_insight_text = batch_insights.get(chart_label) or "[Error: No response for chart]"
+                    all_insights_to_paste[slide_num][textbox_name] = {'text': chart_insight_text, 'type': 'chart_specific'}
+                    # Keep the summary input as each insight lands instead of
+                    # re-walking the paste map afterwards
+                    first_line = next((ln.strip() for ln in chart_insight_text.splitlines() if ln.strip()), '')
+                    if first_line:
+                        chart_first_lines.append(_LEADING_BULLET_RE.sub('', first_line))
+                    print(f"      Stored insight for chart '{chart_title}' targeting textbox '{textbox_name}'.")
 
             # After processing chart-specific textboxes, create a combined summary for slide 7
             if slide_num == 7:
                 sp_shape = summary_placeholders_map.get(str(slide_num))
                 if sp_shape:
-
-                    chart_texts = []
-                    for k, v in all_insights_to_paste.get(slide_num, {}).items():
-                        if isinstance(v, dict) and v.get('type') == 'chart_specific':
-                            t = v.get('text') or ''
-                            first_line = next((ln.strip() for ln in t.splitlines() if ln.strip()), '')
-                            if first_line:
-                                # Remove leading numbering/bullets (e.g., '1. ', '- ', '* ')
-                                cleaned = re.sub(r'^\s*[\d\-\*]+\.?\s*', '', first_line)
-                                chart_texts.append(cleaned)
+                    chart_texts = chart_first_lines
 
                     if chart_texts:
                         # Build a prompt from the chart-level insights and ask the LLM
@@ -1031,7 +2232,12 @@ def generate_and_paste_insights(config_file_path):
                         prompt_key = f"slide_{slide_num}_summary_from_charts"
                         all_prompts_generated[prompt_key] = prompt
 
-                        raw_response = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature, max_tokens_response=60)
+                        if llm_mode == "batch":
+                            # Depends on the chart insights above, so this is its
+                            # own mini-batch submitted after that one resolves
+                            raw_response = generate_all_insights_batch({prompt_key: prompt}, model_id=llm_model_id, temperature=llm_temperature, max_tokens_response=60).get(prompt_key)
+                        else:
+                            raw_response = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature, max_tokens_response=60)
                         parsed = parse_llm_response(slide_num, raw_response)
                         summary_phrase = parsed.get('summary_phrase') or "[No summary generated]"
                     else:
@@ -1056,9 +2262,19 @@ def generate_and_paste_insights(config_file_path):
                 if sp_shape: all_insights_to_paste[slide_num][sp_shape] = {'text': "[No prompt generated]", 'type': 'summary_phrase'}
                 continue
 
+            if slide_num not in [2, 3, 4, 5]:
+                # No cross-slide dependency: queue for one concurrent gather
+                # after the loop instead of paying the RTT serially here
+                deferred_prompts[slide_num] = prompt
+                print(f"  Queued slide {slide_num} for concurrent LLM fan-out.")
+                continue
+
+            # Slides 3/4/5 feed context snippets into slide 2's prompt, so
+            # this chain has to stay serial; stream the response so cleanup of
+            # the main insight overlaps with the summary still decoding
             print(f"  Calling LLM for slide {slide_num}...")
-            raw_response_text = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature)
-            parsed_result = parse_llm_response(slide_num, raw_response_text)
+            response_deltas = function_4_call_llm(prompt, llm_client, model_id=llm_model_id, temperature=llm_temperature, stream=True)
+            parsed_result = parse_llm_stream(slide_num, response_deltas)
             # if slide_num == 8:
             #     print("\nFINAL\n")
             #     print(prompt)
@@ -1074,11 +2290,29 @@ def generate_and_paste_insights(config_file_path):
             elif slide_num == 4 and parsed_result['context_snippet']: slide_2_context_snippets['owned_campaign'] = parsed_result['context_snippet']; print(f"    Stored 'owned_campaign' context for Slide 2: '{parsed_result['context_snippet']}'")
             elif slide_num == 5 and parsed_result['context_snippet']: slide_2_context_snippets['paid_partner'] = parsed_result['context_snippet']; print(f"    Stored 'paid_partner' context for Slide 2: '{parsed_result['context_snippet']}'")
 
-    # --- Optional: Print or save the stored prompts ---
-    print("\n--- Generated Prompts ---")
-    for key, prompt_text in all_prompts_generated.items():
-        print(f"\n--- Prompt Key: {key} ---")
-        print(prompt_text[:1000] + "...") # Print start of each prompt
+    extraction_pool.shutdown(wait=False)
+
+    # --- Run all queued independent slide prompts concurrently ---
+    if deferred_prompts:
+        if llm_mode == "batch":
+            # Scheduled runs trade latency for the Batch API's cost/rate-limit wins
+            print(f"\nSubmitting {len(deferred_prompts)} queued slide prompts via the Batch API...")
+            deferred_responses = generate_all_insights_batch(deferred_prompts, model_id=llm_model_id, temperature=llm_temperature)
+        else:
+            print(f"\nRunning {len(deferred_prompts)} queued slide prompts concurrently...")
+            deferred_responses = asyncio.run(generate_all_insights(deferred_prompts, model_id=llm_model_id, temperature=llm_temperature))
+        for slide_num in deferred_prompts:
+            parsed_result = parse_llm_response(slide_num, deferred_responses.get(slide_num))
+            kh_shape = insight_placeholders_map.get(str(slide_num)); sp_shape = summary_placeholders_map.get(str(slide_num))
+            if kh_shape: all_insights_to_paste[slide_num][kh_shape] = {'text': parsed_result['main_insight'], 'type': 'key_highlight'}
+            if sp_shape: all_insights_to_paste[slide_num][sp_shape] = {'text': parsed_result['summary_phrase'], 'type': 'summary_phrase'}
+            print(f"  Stored parsed result for slide {slide_num}.")
+
+    # --- Optional: Log the stored prompts (debug level only; prompts run to
+    # tens of KB each and synchronous stdout writes add up on long decks) ---
+    if log.isEnabledFor(logging.DEBUG):
+        for key, prompt_text in all_prompts_generated.items():
+            log.debug("Prompt %s: %.1000s...", key, prompt_text)
     # You could also save `all_prompts_generated` to a file here if needed
 
     # 6. Paste Insights into PPT using the consolidated map
@@ -1092,11 +2326,20 @@ def generate_and_paste_insights(config_file_path):
     print("\n--- Saving Final Outputs ---")
     try:
         if 'presentation' in locals() and presentation:
-            presentation.save(PPTX_OUTPUT_PATH)
+            try:
+                # Only the pasted slides changed; patch those XML parts into a
+                # byte-for-byte copy instead of re-serializing the whole deck
+                _save_presentation_patched(presentation, PPTX_FILE_PATH, PPTX_OUTPUT_PATH, all_insights_to_paste.keys())
+            except Exception as patch_error:
+                print(f"  Patched save failed ({patch_error}); falling back to full save.")
+                presentation.save(PPTX_OUTPUT_PATH)
             print(f"Successfully saved presentation with insights to: {PPTX_OUTPUT_PATH}")
         else: print("Error: Presentation object not loaded correctly. Cannot save.")
     except Exception as e: print(f"ERROR saving modified PowerPoint presentation to '{PPTX_OUTPUT_PATH}': {e}")
 
+    # Release the read-only workbook handles held by the cache
+    close_cached_workbooks()
+
     print("\n--- Insight Generation and Pasting Process Complete ---")
 
 # ==============================================================================
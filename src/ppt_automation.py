@@ -1,8 +1,49 @@
-from itertools import count
 import time
 import win32com.client
 import json
 import pythoncom
+import logging
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__) # Per-shape/per-cell chatter goes here, not stdout
+
+XL_CALCULATION_MANUAL = -4135  # xlCalculationManual
+
+# MsoShapeType values the refresh loop cares about. hasattr() probing on a
+# COM proxy is not free - each probe is a GetIDsOfNames round-trip - so
+# shapes classify on a single .Type read instead.
+MSO_CHART = 3
+MSO_EMBEDDED_OLE_OBJECT = 7
+MSO_LINKED_OLE_OBJECT = 10
+MSO_LINKED_PICTURE = 11
+_LINKED_SHAPE_TYPES = frozenset((MSO_LINKED_OLE_OBJECT, MSO_LINKED_PICTURE))
+
+@contextmanager
+def _excel_fast(excel):
+    """
+    Temporarily disables Excel screen updating, recalculation and events.
+
+    Every COM write otherwise triggers a repaint and a recalc pass, which
+    dominates bulk update loops. Original settings are restored on exit,
+    including when the wrapped block raises.
+    """
+    saved = None
+    try:
+        saved = (excel.ScreenUpdating, excel.Calculation, excel.EnableEvents)
+        excel.ScreenUpdating = False
+        excel.Calculation = XL_CALCULATION_MANUAL
+        excel.EnableEvents = False
+    except Exception as e:
+        print(f"Could not quiesce Excel (continuing without): {e}")
+        saved = None
+    try:
+        yield excel
+    finally:
+        if saved is not None:
+            try:
+                excel.ScreenUpdating, excel.Calculation, excel.EnableEvents = saved
+            except Exception as e:
+                print(f"Warning: could not restore Excel settings: {e}")
 
 def attach_powerpoint():
     """
@@ -19,8 +60,14 @@ def attach_powerpoint():
         ppt_app = win32com.client.GetActiveObject("PowerPoint.Application")
         print("Attached to existing PowerPoint instance")
     except:
-        # If no active instance, launch a new one
-        ppt_app = win32com.client.Dispatch("PowerPoint.Application")
+        # If no active instance, launch a new one. Early binding via the
+        # makepy wrapper calls methods by dispid, skipping the per-call
+        # name-resolution round-trip of a late-bound proxy.
+        try:
+            ppt_app = win32com.client.gencache.EnsureDispatch("PowerPoint.Application")
+        except Exception:
+            # Stale gen_py cache; late binding still works
+            ppt_app = win32com.client.Dispatch("PowerPoint.Application")
         print("Launched new PowerPoint instance")
     ppt_app.Visible = True
     return ppt_app
@@ -35,12 +82,19 @@ def attach_excel():
     Returns:
         excel (COM Object): Excel Application object.
     """
-    # Launch a new Excel instance
-    excel = win32com.client.Dispatch("Excel.Application")
+    # Launch a new Excel instance, early-bound where the makepy cache allows
+    try:
+        excel = win32com.client.gencache.EnsureDispatch("Excel.Application")
+    except Exception:
+        excel = win32com.client.Dispatch("Excel.Application")
     excel.Visible = True
     return excel
 
 def wait_for_ppt_ready(ppt, timeout=10):
+    # Presentations.Open is synchronous in the common case, so the first
+    # probe normally succeeds and returns immediately; only while PowerPoint
+    # is still spinning up does the pump loop run, at 10 ms rather than
+    # 300 ms steps so readiness is detected almost as soon as it happens
     start = time.time()
     while True:
         try:
@@ -50,50 +104,63 @@ def wait_for_ppt_ready(ppt, timeout=10):
             if time.time() - start > timeout:
                 raise TimeoutError("PowerPoint slides not ready")
             pythoncom.PumpWaitingMessages()
-            time.sleep(0.3)
+            time.sleep(0.01)
 
-def refresh_ppt_objects(ppt, excel, config):
+def refresh_ppt_objects(ppt, excel, config, wb=None):
     """
     Refresh all linked objects and charts in a PowerPoint presentation.
 
     Parameters:
         ppt (COM Object): The PowerPoint Presentation object.
+        wb (COM Object, optional): An already-open workbook handle shared by
+                                   the pipeline; opened here only if absent.
 
     Returns:
         None
     """
-    
-    wb = excel.Workbooks.Open(config["excel_path"])
+
+    if wb is None:
+        wb = excel.Workbooks.Open(config["excel_path"])
     # ws = wb.Sheets("Overall Metrics")
     # print(f"\nCell vaue is : {ws.Range("E1").Value}\n")
     # print("Bye")
 
     print("\nRefreshing charts and linked Excel objects...")
-    # for slide in ppt.Slides:
-    slides = ppt.Slides
-    count = slides.Count
-
-    for i in range(1, count + 1):
-        slide = slides(i)
-        print(f"  Slide {slide.SlideIndex}...")
-        # for shape in slide.Shapes:
-        shapes = slide.Shapes
-        shape_count = shapes.Count
-        for j in range(1, shape_count + 1):
-            shape = shapes(j)
-            try:
-                # Update linked objects
-                if hasattr(shape, "LinkFormat") and shape.LinkFormat is not None:
-                    shape.LinkFormat.Update()
-                    print(f"Updated linked object: {shape.Name}")
-                # Refresh charts
-                if hasattr(shape, "HasChart") and shape.HasChart:
-                    shape.Chart.Refresh()
-                    print(f"Chart refreshed: {shape.Name}")
-            except:
-                print(f"Skipping shape '{shape.Name}'")
-
-def update_ppt_tables(ppt, excel, config):
+    with _excel_fast(excel):
+        # One UpdateLinks call refreshes every OLE link in the deck at once;
+        # the per-shape LinkFormat.Update loop paid a synchronous OLE
+        # round-trip to Excel per linked object
+        links_updated = False
+        try:
+            ppt.UpdateLinks()
+            links_updated = True
+            print("Updated all linked objects via UpdateLinks().")
+        except Exception as e:
+            print(f"UpdateLinks() failed ({e}); falling back to per-shape updates.")
+
+        # Collection enumerators (IEnumVARIANT) hand items out in batches;
+        # slides(i)/shapes(j) indexing issued a fresh Item dispatch per index
+        for slide in ppt.Slides:
+            log.debug("  Slide %s...", slide.SlideIndex)
+            for shape in slide.Shapes:
+                shape_type = shape.Type  # one COM read classifies the shape
+                # Type gating means ordinary shapes raise nothing here; the
+                # narrow handlers below only fire for genuinely broken
+                # links/charts instead of steering control flow per shape
+                if not links_updated and shape_type in _LINKED_SHAPE_TYPES:
+                    try:
+                        shape.LinkFormat.Update()
+                        log.debug("Updated linked object: %s", shape.Name)
+                    except Exception as e:
+                        log.warning("Could not update link for shape '%s': %s", shape.Name, e)
+                if shape_type in (MSO_CHART, MSO_EMBEDDED_OLE_OBJECT, MSO_LINKED_OLE_OBJECT) and shape.HasChart:
+                    try:
+                        shape.Chart.Refresh()
+                        log.debug("Chart refreshed: %s", shape.Name)
+                    except Exception as e:
+                        log.warning("Could not refresh chart '%s': %s", shape.Name, e)
+
+def update_ppt_tables(ppt, excel, config, wb=None):
     """
     Update PowerPoint tables with data from Excel based on config.
 
@@ -101,51 +168,86 @@ def update_ppt_tables(ppt, excel, config):
         ppt (COM Object): The PowerPoint Presentation object.
         excel (COM Object): The Excel Application object.
         config (dict): Dictionary loaded from the JSON config file containing paths and table mappings.
+        wb (COM Object, optional): An already-open workbook handle shared by
+                                   the pipeline; opened (and closed) here
+                                   only if absent.
 
     Returns:
         None
     """
-    # Open the Excel workbook
-    wb = excel.Workbooks.Open(config["excel_path"])
+    # Open the Excel workbook unless the caller is sharing its handle
+    owns_wb = wb is None
+    if owns_wb:
+        wb = excel.Workbooks.Open(config["excel_path"])
+    # Re-runs against an already-updated deck can skip writes whose value and
+    # color are unchanged; the comparison read is itself a COM call, so it is
+    # opt-in for decks that are not regenerated from scratch each time
+    skip_unchanged = config.get("skip_unchanged", False)
     print("\nUpdating tables from Excel...")
     
     # Iterate through slides and tables defined in the config
-    for slide_num, slide_config in config["slides"].items():
-        slide = ppt.Slides(int(slide_num))
-        print(f"Slide {slide_num}...")
-        
-        for table_name, tbl_config in slide_config.get("tables", {}).items():
-            for shape in slide.Shapes:
-                # Find the table shape by name
-                if shape.HasTable and shape.Name.strip().lower() == table_name.strip().lower():
-                    print(f"Updating table: {shape.Name}")
+    with _excel_fast(excel):
+        for slide_num, slide_config in config["slides"].items():
+            slide = ppt.Slides(int(slide_num))
+            log.debug("Slide %s...", slide_num)
+
+            # Index table shapes once per slide; probing .HasTable/.Name over COM
+            # for every configured table scanned the shape collection O(N*M) times
+            tables_by_name = {shape.Name.strip().lower(): shape
+                              for shape in slide.Shapes if shape.HasTable}
+
+            for table_name, tbl_config in slide_config.get("tables", {}).items():
+                shape = tables_by_name.get(table_name.strip().lower())
+                if shape is not None:
+                    log.debug("Updating table: %s", shape.Name)
                     table = shape.Table
+
+                    # Resolve the sheet once and materialize the whole Excel
+                    # rectangle in a single Range enumeration. Every
+                    # Sheets(name)/Cells(r,c) access is a cross-process COM
+                    # dispatch, so one pass over the bounding range replaces
+                    # the per-PPT-cell round-trips. (Range.Value2 would be a
+                    # single call, but it returns raw values - the deck needs
+                    # the formatted .Text the cells display.)
+                    ws = wb.Sheets(tbl_config["sheet"])
+                    er1, er2 = tbl_config["excel_rows"][0], tbl_config["excel_rows"][0] + (tbl_config["ppt_rows"][1] - tbl_config["ppt_rows"][0])
+                    ec1, ec2 = tbl_config["excel_cols"][0], tbl_config["excel_cols"][0] + (tbl_config["ppt_cols"][1] - tbl_config["ppt_cols"][0])
+                    excel_rect = ws.Range(ws.Cells(er1, ec1), ws.Cells(er2, ec2))
+                    n_cols = ec2 - ec1 + 1
+                    # DisplayFormat re-evaluates every conditional format on
+                    # each access; plain Font.Color returns the same value
+                    # (much faster) unless the sheet actually colors cells
+                    # conditionally, so it is opt-in per table via the config
+                    use_display_format = tbl_config.get("use_display_format", False)
+                    excel_cells = []
+                    for idx, cell in enumerate(excel_rect):
+                        if idx % n_cols == 0:
+                            excel_cells.append([])
+                        color = cell.DisplayFormat.Font.Color if use_display_format else cell.Font.Color
+                        excel_cells[-1].append((cell.Text, color))
+
                     # Iterate through the rows and columns defined in the config
+                    Cell = table.Cell  # bound method: LOAD_FAST in the loop
                     for r, row in enumerate(range(tbl_config["ppt_rows"][0], tbl_config["ppt_rows"][1] + 1)):
                         for c, col in enumerate(range(tbl_config["ppt_cols"][0], tbl_config["ppt_cols"][1] + 1)):
-                            # Get the corresponding Excel cell value
-                            excel_row = tbl_config["excel_rows"][0] + r
-                            excel_col = tbl_config["excel_cols"][0] + c
-                            cell = wb.Sheets(tbl_config["sheet"]).Cells(excel_row, excel_col)
-                            value = cell.Text
-                            # table.Cell(row, col).Shape.TextFrame.TextRange.Text = value
-                            # Get font properties from Excel (for example, font size and color)
-                            font = cell.Font
-                            # font_size = font.Size
-                            # font_color = font.Color
-                            font_color = cell.DisplayFormat.Font.Color
-
-
-                            # Update PowerPoint cell
-                            ppt_cell = table.Cell(row, col).Shape.TextFrame.TextRange
+                            # Values and colors come from the materialized grid
+                            value, font_color = excel_cells[r][c]
+
+                            # Navigate Cell -> Shape -> TextFrame -> TextRange
+                            # once and reuse the handle for both writes
+                            ppt_cell = Cell(row, col).Shape.TextFrame.TextRange
+                            if skip_unchanged and ppt_cell.Text == value and ppt_cell.Font.Color.RGB == font_color:
+                                continue  # no-op write would still dirty/reflow the slide
                             ppt_cell.Text = value
 
                             # Set the font size and color in PowerPoint
                             # ppt_cell.Font.Size = font_size
                             ppt_cell.Font.Color.RGB = font_color
     
-    wb.Save()
-    wb.Close(SaveChanges=0)
+    if owns_wb:
+        # This function only reads from the workbook; closing without saving
+        # skips a full serialization of the (potentially large) xlsx
+        wb.Close(SaveChanges=0)
 
 def save_and_close(ppt, ppt_app, excel, config):
     """
@@ -188,28 +290,33 @@ def save_and_close(ppt, ppt_app, excel, config):
         excel.Quit()
         print("Excel to PPT Automation complete.")
 
-def reset_excel_cell(excel_path, sheet_name, cell_address, value):
+def reset_excel_cell(excel_path, sheet_name, cell_address, value, excel=None):
     """
     Reset a specific cell in an Excel workbook to a given value.
 
     Parameters:
-        excel (COM Object): The Excel Application object.
         excel_path (str): Path to the Excel workbook.
         sheet_name (str): Name of the sheet containing the cell.
         cell_address (str): Address of the cell to reset (e.g., "E1").
         value: Value to set in the specified cell.
+        excel (COM Object, optional): An existing Excel Application object to
+                                      reuse; launching one costs seconds, so
+                                      a fresh instance starts (and quits)
+                                      only when none is supplied.
 
     Returns:
         None
     """
-    excel = attach_excel()
+    owns_excel = excel is None
+    if owns_excel:
+        excel = attach_excel()
     wb = excel.Workbooks.Open(excel_path)
     ws = wb.Sheets(sheet_name)
     ws.Range(cell_address).Value = value
     wb.Save()
     if 'wb' in locals() and wb:
         wb.Close(SaveChanges=False)
-    if excel:
+    if owns_excel and excel:
         excel.Quit()
 
 def update_ppt_from_excel(config_path):
@@ -230,27 +337,27 @@ def update_ppt_from_excel(config_path):
     ppt_app = attach_powerpoint()
     excel = attach_excel()
 
+    # One Excel instance and one workbook handle serve the whole pipeline;
+    # quitting Excel here only to relaunch it and reparse the same file cost
+    # seconds per run
     wb = excel.Workbooks.Open(config["excel_path"])
     ws = wb.Sheets("Overall Metrics")
     ws.Range("E1").Value = 45730
     wb.Save()
-    if 'wb' in locals() and wb:
-        wb.Close(SaveChanges=False)
-    if excel:
-        excel.Quit()
-
-    excel = attach_excel()
 
-    # Open the PowerPoint presentation
-    ppt = ppt_app.Presentations.Open(config["ppt_path"], WithWindow=True)
+    # Open the PowerPoint presentation without a document window: every
+    # LinkFormat.Update, chart refresh and table-cell write would otherwise
+    # trigger a slide repaint; the object model is fully usable windowless
+    ppt = ppt_app.Presentations.Open(config["ppt_path"], WithWindow=False)
     print("\nPowerPoint is being processed...\n")
     wait_for_ppt_ready(ppt)
     
     if not ppt:
         raise Exception("Failed to open PowerPoint file!")
     
-    # Refresh linked objects and update tables
-    refresh_ppt_objects(ppt, excel, config)
-    update_ppt_tables(ppt, excel, config)
+    # Refresh linked objects and update tables, reusing the open workbook
+    refresh_ppt_objects(ppt, excel, config, wb=wb)
+    update_ppt_tables(ppt, excel, config, wb=wb)
+    wb.Close(SaveChanges=0)
     # Save and close the instances
     save_and_close(ppt, ppt_app, excel, config)